@@ -1,8 +1,18 @@
 import streamlit as st
 import pandas as pd
-from components.csv_handler import load_csv, summarize_data
+from components.csv_handler import load_csv, summarize_data, STREAMING_THRESHOLD_BYTES
 from components.mysql_handler import MySQLHandler
+from components.sampling import STRATIFIED, UNIFORM, sampling_info
+from components.sql_engine import sql_engine
 from components.ai_processor import AIProcessor
+from components.data_profile import CATEGORICAL_DTYPES
+from components.dataset_store import dataset_store
+from components.health_monitor import health_monitor, HEALTHY, DEGRADED, DOWN, UNKNOWN
+from components.llm_client import reset_clients
+from components.llm_gateway import llm_gateway
+from components.response_cache import response_cache
+from components.chart_renderer import chart_renderer
+from components.sandbox_executor import replay_outputs
 from components.visualizer import Visualizer
 from utils.error_handler import handle_error
 from utils.logger import app_logger
@@ -14,22 +24,19 @@ def main():
     with st.sidebar:
         st.subheader("⚙️ Settings")
         
-        # Check OpenAI availability
-        try:
-            from utils.security import load_api_key, test_api_key
-            api_key = load_api_key()
-            
-            # Test the API key
-            test_result = test_api_key(api_key)
-            if test_result == True:
-                st.success("✅ OpenAI Connected & Working")
-                openai_available = True
-            else:
-                st.error("❌ OpenAI API Key Invalid")
-                openai_available = False
-        except Exception as e:
+        # OpenAI availability comes from the cached background health check
+        health = health_monitor.status(wait=5)
+        openai_available = health["state"] != DOWN
+        if health["state"] == HEALTHY:
+            st.success(f"✅ OpenAI Connected & Working ({health['latency'] * 1000:.0f} ms)")
+        elif health["state"] == DEGRADED:
+            st.warning(f"⚠️ OpenAI Degraded: {health['error']}")
+        elif health["state"] == UNKNOWN:
+            st.info("⏳ Checking OpenAI connection...")
+        elif health["error"] and health["error"].startswith("Configuration error"):
             st.error("❌ OpenAI Configuration Error")
-            openai_available = False
+        else:
+            st.error("❌ OpenAI API Key Invalid")
         
         if not openai_available:
             st.markdown("### 🔧 Fix API Key Issue:")
@@ -39,12 +46,35 @@ def main():
             2. **Update your config.json**
             3. **Restart the application**
             """)
+            if st.button("🔄 Check Again"):
+                # Pick up an edited config.json before probing again
+                reset_clients()
+                llm_gateway.reset()
+                health_monitor.refresh(wait=5)
+                st.rerun()
             st.stop()
 
         # Advanced settings
         with st.expander("Advanced Settings"):
             show_code = st.checkbox("Show Generated Code", value=False)
+            # Analysis as one SQL query in the embedded multi-threaded engine instead of pandas code
+            use_sql = st.checkbox(
+                "SQL engine", value=False, disabled=not sql_engine.available,
+                help="Answer analysis requests with SQL run by DuckDB" if sql_engine.available
+                else "Install duckdb to enable the SQL engine"
+            )
             show_debug = st.checkbox("Show Debug Info", value=False)
+            if show_debug:
+                cache_stats = response_cache.stats()
+                st.caption(
+                    f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['evictions']} evicted"
+                )
+                chart_stats = chart_renderer.cache.stats()
+                st.caption(
+                    f"Chart cache: {chart_stats['entries']} charts, {chart_stats['memory_mb']} MB, "
+                    f"{chart_stats['hits']} hits, {chart_stats['misses']} misses"
+                )
     
     # Data source selection
     st.subheader("📊 Choose Your Data Source")
@@ -61,9 +91,24 @@ def main():
         uploaded_file = st.file_uploader("📂 Upload your CSV file", type=["csv"])
         
         if uploaded_file is not None:
+            sample_rows = None
+            if uploaded_file.size > STREAMING_THRESHOLD_BYTES:
+                if st.checkbox("🎲 Load a random sample", value=False, key="csv_sample",
+                               help="Statistics still cover every row of the file"):
+                    sample_rows = st.number_input("Sample size:", min_value=1000, value=100000,
+                                                  step=10000, key="csv_sample_rows")
             try:
                 with st.spinner("🔄 Loading your data..."):
-                    data = load_csv(uploaded_file)
+                    progress = None
+                    if uploaded_file.size > STREAMING_THRESHOLD_BYTES:
+                        progress = st.progress(0.0, text="Reading file in chunks...")
+                    data = load_csv(
+                        uploaded_file,
+                        progress_callback=(lambda fraction: progress.progress(fraction)) if progress else None,
+                        sample_rows=sample_rows
+                    )
+                    if progress:
+                        progress.empty()
                 
                 if data is not None:
                     st.success(f"✅ CSV loaded successfully!")
@@ -101,7 +146,9 @@ def main():
                 st.success(f"✅ Using data from table: {st.session_state.selected_table_name}")
                 display_data_info(data)
             else:
-                # Show table selection
+                # Show table selection (metadata is cached; refresh after schema changes)
+                if st.button("🔄 Refresh Tables", key="refresh_tables_btn"):
+                    mysql_handler.refresh_metadata()
                 tables = mysql_handler.get_tables()
                 
                 if tables:
@@ -110,11 +157,23 @@ def main():
                     
                     if selected_table:
                         # Show table info
-                        table_info = mysql_handler.get_table_info(selected_table)
+                        exact_count = st.session_state.get("exact_count_table") == selected_table
+                        table_info = mysql_handler.get_table_info(selected_table, exact_count=exact_count)
                         if table_info:
                             col1, col2 = st.columns(2)
                             with col1:
-                                st.metric("📊 Total Rows", f"{table_info['row_count']:,}")
+                                row_count = table_info['row_count']
+                                if row_count is None:
+                                    st.metric("📊 Total Rows", "Unknown")
+                                elif table_info['row_count_is_estimate']:
+                                    st.metric("📊 Total Rows", f"~{row_count:,}", help="Estimated from table statistics")
+                                else:
+                                    st.metric("📊 Total Rows", f"{row_count:,}")
+                                if table_info['row_count_is_estimate']:
+                                    if st.button("🔢 Exact Count", key="exact_count_btn"):
+                                        # COUNT(*) can take a while on large tables, so only on request
+                                        st.session_state.exact_count_table = selected_table
+                                        st.rerun()
                             with col2:
                                 st.metric("📋 Columns", len(table_info['columns']))
                             
@@ -127,22 +186,65 @@ def main():
                         # Load data button
                         col1, col2 = st.columns(2)
                         with col1:
-                            load_limit = st.number_input("Rows to load (max 10000):", min_value=100, max_value=10000, value=1000, key="load_limit")
+                            load_full_table = st.checkbox("Load entire table", value=False, key="load_full_table")
+                            load_limit = st.number_input(
+                                "Rows to load:", min_value=100, value=1000, step=1000,
+                                key="load_limit", disabled=load_full_table
+                            )
+                            # First rows are whatever the engine returns first (often the oldest)
+                            load_mode = st.selectbox(
+                                "Which rows:", ["First rows", "Random sample", "Stratified sample"],
+                                key="load_mode", disabled=load_full_table
+                            )
+                            stratify_column = None
+                            if load_mode == "Stratified sample" and table_info:
+                                stratify_column = st.selectbox(
+                                    "Stratify by:", [col[0] for col in table_info['columns']],
+                                    key="stratify_column", disabled=load_full_table
+                                )
                         
                         with col2:
                             if st.button("📥 Load Table Data", type="primary", key="load_data_btn"):
-                                with st.spinner(f"Loading data from {selected_table}..."):
-                                    loaded_data = mysql_handler.load_table_data(selected_table, load_limit)
-                                    
-                                    if loaded_data is not None:
-                                        # Store data in session state
-                                        st.session_state.mysql_data = loaded_data
-                                        st.session_state.selected_table_name = selected_table
-                                        data = loaded_data
-                                        st.success(f"✅ Loaded {len(data)} rows from {selected_table}")
-                                        st.rerun()  # Rerun to show the data interface
+                                expected_rows = table_info['row_count'] if table_info else None
+                                # Rows are streamed in chunks; any rerun (e.g. Stop) ends the load
+                                stop_placeholder = st.empty()
+                                stop_placeholder.button("⏹️ Stop loading", key="stop_load_btn")
+                                progress_bar = st.progress(0.0, text=f"Loading data from {selected_table}...")
+                                
+                                def show_progress(loaded, expected):
+                                    if expected:
+                                        progress_bar.progress(min(loaded / expected, 1.0), text=f"Loaded {loaded:,} of ~{expected:,} rows")
                                     else:
-                                        st.error("❌ Failed to load table data")
+                                        progress_bar.progress(0.0, text=f"Loaded {loaded:,} rows")
+                                
+                                if load_full_table or load_mode == "First rows":
+                                    loaded_data = mysql_handler.load_table_data(
+                                        selected_table,
+                                        None if load_full_table else load_limit,
+                                        progress_callback=show_progress,
+                                        expected_rows=expected_rows
+                                    )
+                                else:
+                                    loaded_data = mysql_handler.load_table_sample(
+                                        selected_table,
+                                        load_limit,
+                                        method=STRATIFIED if load_mode == "Stratified sample" else UNIFORM,
+                                        stratify_column=stratify_column,
+                                        progress_callback=show_progress
+                                    )
+                                progress_bar.empty()
+                                stop_placeholder.empty()
+                                
+                                if loaded_data is not None:
+                                    # Store the shared read-only copy in session state
+                                    loaded_data = dataset_store.share(loaded_data)
+                                    st.session_state.mysql_data = loaded_data
+                                    st.session_state.selected_table_name = selected_table
+                                    data = loaded_data
+                                    st.success(f"✅ Loaded {len(data):,} rows from {selected_table}")
+                                    st.rerun()  # Rerun to show the data interface
+                                else:
+                                    st.error("❌ Failed to load table data")
                 else:
                     st.warning("No tables found in the database")
         else:
@@ -204,10 +306,18 @@ def main():
         # Display chat history
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
+                # Charts are replayed from the render cache, not re-run
+                if message.get("outputs_key"):
+                    outputs = chart_renderer.cache.get(message["outputs_key"])
+                    if outputs is not None:
+                        replay_outputs(outputs)
+                    else:
+                        st.caption("Chart no longer cached - ask again to redraw it.")
                 st.write(message["content"])
         
-        # Chat input
-        if prompt := st.chat_input("Ask me anything about your data..."):
+        # Chat input - Quick Actions queue a pending prompt and rerun
+        typed_prompt = st.chat_input("Ask me anything about your data...")
+        if prompt := typed_prompt or st.session_state.pop("pending_prompt", None):
             # Add user message to chat history
             st.session_state.messages.append({"role": "user", "content": prompt})
             with st.chat_message("user"):
@@ -215,64 +325,98 @@ def main():
             
             # Generate AI response
             with st.chat_message("assistant"):
-                with st.spinner("🤔 Analyzing..."):
-                    try:
+                try:
+                    with st.spinner("🤔 Analyzing..."):
                         # Initialize AI processor
                         ai_processor = AIProcessor()
                         
-                        # Process the prompt
-                        result = ai_processor.process_prompt(prompt, data)
+                        # Process the prompt (conversational answers come back as a token stream)
+                        result = ai_processor.process_prompt(prompt, data, stream=True, use_sql=use_sql)
+                    
+                    if result["type"] == "stream":
+                        # Show tokens as they arrive, then keep the full text in history
+                        content = st.write_stream(result["content"])
+                        st.session_state.messages.append({
+                            "role": "assistant",
+                            "content": content
+                        })
+                    
+                    elif result["type"] == "conversation":
+                        # Display conversational response
+                        st.write(result["content"])
+                        st.session_state.messages.append({
+                            "role": "assistant", 
+                            "content": result["content"]
+                        })
+                    
+                    elif result["type"] == "code":
+                        # Show code if requested
+                        if show_code:
+                            with st.expander("🔍 Generated Code"):
+                                st.code(result["content"], language=result.get("language", "python"))
+                                for finding in result.get("findings", []):
+                                    st.caption(f"⚡ {finding}")
                         
-                        if result["type"] == "conversation":
-                            # Display conversational response
-                            st.write(result["content"])
-                            st.session_state.messages.append({
-                                "role": "assistant", 
-                                "content": result["content"]
-                            })
+                        plan = result.get("plan")
+                        if plan is not None and plan.action == "sample":
+                            st.info(f"⚡ {plan.reason}")
                         
-                        elif result["type"] == "code":
-                            # Show code if requested
-                            if show_code:
-                                with st.expander("🔍 Generated Code"):
-                                    st.code(result["content"], language="python")
-                            
-                            # Execute code and show results
-                            execution_result = ai_processor.execute_code(result["content"], data)
-                            
-                            if execution_result["success"]:
-                                response_msg = "✅ Analysis completed!"
-                                st.success(response_msg)
-                                st.session_state.messages.append({
-                                    "role": "assistant",
-                                    "content": response_msg
-                                })
+                        # Execute code and show results
+                        # Any rerun (e.g. the Stop button) interrupts the progress
+                        # update and stops the sandbox worker running the code
+                        stop_placeholder = st.empty()
+                        stop_placeholder.button("⏹️ Stop analysis")
+                        elapsed_placeholder = st.empty()
+                        show_elapsed = lambda elapsed: elapsed_placeholder.caption(f"⏱️ Running for {elapsed:.0f}s")
+                        with st.spinner("📊 Running analysis..."):
+                            if result.get("language") == "sql":
+                                execution_result = ai_processor.execute_sql(
+                                    result["content"], data, progress_callback=show_elapsed
+                                )
                             else:
-                                error_msg = f"❌ Execution error: {execution_result['error']}"
-                                st.error(error_msg)
-                                st.session_state.messages.append({
-                                    "role": "assistant",
-                                    "content": error_msg
-                                })
+                                execution_result = ai_processor.execute_code(
+                                    result.get("compiled", result["content"]),
+                                    data,
+                                    progress_callback=show_elapsed,
+                                    plan=plan
+                                )
+                        stop_placeholder.empty()
+                        elapsed_placeholder.empty()
                         
-                        elif result["type"] == "error":
-                            st.error(result["content"])
+                        if execution_result["success"]:
+                            response_msg = "✅ Analysis completed!"
+                            st.success(response_msg)
                             st.session_state.messages.append({
                                 "role": "assistant",
-                                "content": result["content"]
+                                "content": response_msg,
+                                "outputs_key": execution_result.get("outputs_key")
+                            })
+                        else:
+                            error_msg = f"❌ Execution error: {execution_result['error']}"
+                            st.error(error_msg)
+                            st.session_state.messages.append({
+                                "role": "assistant",
+                                "content": error_msg
                             })
                     
-                    except Exception as e:
-                        error_msg = f"❌ System error: {str(e)}"
-                        st.error(error_msg)
+                    elif result["type"] == "error":
+                        st.error(result["content"])
                         st.session_state.messages.append({
                             "role": "assistant",
-                            "content": error_msg
+                            "content": result["content"]
                         })
-                        
-                        if show_debug:
-                            st.exception(e)
-        
+                
+                except Exception as e:
+                    error_msg = f"❌ System error: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": error_msg
+                    })
+                    
+                    if show_debug:
+                        st.exception(e)
+    
         # Quick action buttons
         st.subheader("🚀 Quick Actions")
         col1, col2, col3, col4 = st.columns(4)
@@ -280,19 +424,19 @@ def main():
         with col1:
             if st.button("📊 Data Summary", key="summary"):
                 summary_prompt = "Give me a comprehensive summary of this dataset including key statistics and insights"
-                st.session_state.messages.append({"role": "user", "content": summary_prompt})
+                st.session_state.pending_prompt = summary_prompt
                 st.rerun()
         
         with col2:
             if st.button("📈 Create Charts", key="charts"):
                 chart_prompt = "Create interesting visualizations that best represent this data"
-                st.session_state.messages.append({"role": "user", "content": chart_prompt})
+                st.session_state.pending_prompt = chart_prompt
                 st.rerun()
         
         with col3:
             if st.button("🔍 Find Patterns", key="patterns"):
                 pattern_prompt = "What interesting patterns or correlations can you find in this data?"
-                st.session_state.messages.append({"role": "user", "content": pattern_prompt})
+                st.session_state.pending_prompt = pattern_prompt
                 st.rerun()
         
         with col4:
@@ -333,6 +477,19 @@ def display_data_info(data, file_size=None):
         else:
             st.metric("🗄️ Source", "MySQL")
     
+    memory_report = data.attrs.get("memory_report")
+    if memory_report and memory_report["optimized_bytes"]:
+        original_mb = memory_report["original_bytes"] / (1024 * 1024)
+        optimized_mb = memory_report["optimized_bytes"] / (1024 * 1024)
+        ratio = memory_report["original_bytes"] / memory_report["optimized_bytes"]
+        st.caption(f"🧠 In memory: {optimized_mb:,.1f} MB (was {original_mb:,.1f} MB with default types, {ratio:.1f}x smaller)")
+
+    sampling = sampling_info(data)
+    if sampling:
+        about = "~" if sampling["population_is_estimate"] else ""
+        st.caption(f"🎲 Random sample ({sampling['method']}) of {sampling['sample_rows']:,} out of "
+                   f"{about}{sampling['population_rows']:,} rows; totals are extrapolated to all rows")
+
     # Show data preview
     with st.expander("👀 Data Preview", expanded=False):
         st.dataframe(data.head(10))
@@ -350,7 +507,7 @@ def display_data_info(data, file_size=None):
         
         with col2:
             st.write("**Categorical Columns:**")
-            cat_cols = data.select_dtypes(include=['object']).columns.tolist()
+            cat_cols = data.select_dtypes(include=CATEGORICAL_DTYPES).columns.tolist()
             if cat_cols:
                 st.write(", ".join(cat_cols))
             else:
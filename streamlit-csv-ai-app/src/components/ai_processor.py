@@ -1,103 +1,80 @@
-from openai import OpenAI
-from utils.security import load_api_key
 from utils.logger import app_logger
+from components.data_profile import get_profile, profile_cache
+from components.context_builder import build_context, select_columns
+from components.intent_router import Intent, route_prompt, is_code_request
+from components.sampling import describe_sample
+from components.llm_client import get_api_key
+from components.llm_gateway import llm_gateway
+from components.response_cache import response_cache
+from components.sandbox_executor import sandbox_pool, replay_outputs, run_captured
+from components.chart_renderer import chart_renderer, output_key
+from components.perf_linter import REFUSE, SAMPLE, plan_execution
+from components.code_compiler import CodeValidationError, compile_generated_code, compiled_code_cache
+from components.sql_engine import SQLValidationError, clean_sql, result_chart, sql_engine
+
+MODEL = "gpt-3.5-turbo"
+TEMPERATURE = 0.1  # Lower temperature for more accurate responses
 
 class AIProcessor:
     def __init__(self):
         try:
-            api_key = load_api_key()
-            self.client = OpenAI(api_key=api_key)
-            app_logger.info("AI Processor initialized with OpenAI", show_in_ui=False)
+            # Settings load once per process; all model calls go through the gateway
+            get_api_key()
+            self.gateway = llm_gateway
+            app_logger.debug("AI Processor initialized with OpenAI", show_in_ui=False)
         except Exception as e:
             app_logger.error(f"Failed to initialize OpenAI client: {str(e)}", show_in_ui=False)
             raise Exception("OpenAI initialization failed")
     
-    def process_prompt(self, prompt, dataframe, chat_history=None):
-        """Main method to process user prompts"""
+    def process_prompt(self, prompt, dataframe, chat_history=None, stream=False, use_sql=False):
+        """Main method to process user prompts
+        
+        With stream=True, conversational answers are returned as
+        {"type": "stream", "content": <generator of text chunks>}.
+        With use_sql=True, analysis requests are answered with a SQL query for
+        the embedded engine ({"type": "code", "language": "sql"}) instead of
+        pandas code.
+        """
         try:
+            # Simple lookups are answered from the dataset profile without an LLM call
+            intent = route_prompt(prompt, get_profile(dataframe), dataframe)
+            if intent.kind == Intent.ANSWER:
+                return {"type": "conversation", "content": intent.answer}
+            
             # Build context from the actual data
-            context = self._build_data_context(dataframe)
+            context = self._build_data_context(dataframe, prompt)
             
             # Determine if we need code generation or conversation
-            if self._needs_code_generation(prompt):
+            if intent.kind == Intent.CODE:
+                if use_sql and sql_engine.available:
+                    return self._generate_sql(prompt, dataframe, context)
                 return self._generate_and_execute_code(prompt, dataframe, context)
             else:
-                return self._generate_conversational_response(prompt, dataframe, context)
+                return self._generate_conversational_response(prompt, dataframe, context, stream=stream)
         except Exception as e:
             app_logger.error(f"Error processing prompt: {str(e)}", show_in_ui=False)
             return {"type": "error", "content": f"I encountered an error: {str(e)}. Please try rephrasing your question."}
     
-    def _build_data_context(self, dataframe):
+    def _build_data_context(self, dataframe, prompt=None):
         """Build comprehensive context about the data with actual values"""
-        # Get actual data insights
-        numeric_cols = dataframe.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = dataframe.select_dtypes(include=['object']).columns.tolist()
-        
-        # Build context with FULL dataset statistics, not just samples
-        context = f"""
-        DATASET INFORMATION:
-        - Total rows: {dataframe.shape[0]:,}
-        - Total columns: {dataframe.shape[1]}
-        - Column names: {list(dataframe.columns)}
-        - Numeric columns: {numeric_cols}
-        - Categorical columns: {categorical_cols}
-        
-        IMPORTANT: This dataset contains {dataframe.shape[0]:,} rows of data. When calculating totals, sums, or counts, use ALL rows, not just the sample below.
-        
-        SAMPLE DATA (first 3 rows for reference only):
-        {dataframe.head(3).to_string(index=False)}
-        
-        FULL DATASET STATISTICS:
-        """
-        
-        # Add comprehensive numeric statistics for the FULL dataset
-        if numeric_cols:
-            context += f"\nNumeric column statistics (ALL {dataframe.shape[0]:,} rows):\n"
-            full_stats = dataframe[numeric_cols].describe()
-            context += full_stats.to_string()
-            
-            # Add totals for important columns
-            context += f"\n\nCOLUMN TOTALS (sum of all {dataframe.shape[0]:,} rows):\n"
-            for col in numeric_cols:
-                total = dataframe[col].sum()
-                context += f"{col}: {total:,}\n"
-        
-        # Add categorical value counts for context
-        if categorical_cols:
-            context += f"\nCategorical column information (ALL {dataframe.shape[0]:,} rows):\n"
-            for col in categorical_cols[:3]:  # First 3 categorical columns
-                unique_count = dataframe[col].nunique()
-                most_common = dataframe[col].mode().iloc[0] if len(dataframe[col].mode()) > 0 else "N/A"
-                context += f"{col}: {unique_count} unique values, most common: {most_common}\n"
-        
-        # Add data quality information
-        context += f"\nDATA QUALITY (ALL {dataframe.shape[0]:,} rows):\n"
-        missing_info = dataframe.isnull().sum()
-        if missing_info.sum() > 0:
-            context += "Missing values:\n"
-            for col, missing in missing_info.items():
-                if missing > 0:
-                    context += f"  {col}: {missing} missing ({missing/len(dataframe)*100:.1f}%)\n"
-        else:
-            context += "No missing values found.\n"
-        
-        return context
+        # Statistics are computed once per dataset and reused across prompts;
+        # wide tables are trimmed to the columns most relevant to the prompt
+        profile = get_profile(dataframe)
+        return build_context(profile, prompt) + describe_sample(dataframe, profile)
     
     def _needs_code_generation(self, prompt):
         """Determine if prompt needs code generation"""
-        code_keywords = [
-            'plot', 'chart', 'graph', 'visualize', 'visualization', 'histogram', 
-            'pie', 'bar', 'scatter', 'line chart', 'box plot', 'heatmap', 
-            'correlation', 'show distribution', 'create', 'make', 'generate', 
-            'display chart', 'draw'
-        ]
-        
-        prompt_lower = prompt.lower()
-        return any(keyword in prompt_lower for keyword in code_keywords)
+        return is_code_request(prompt)
     
-    def _generate_conversational_response(self, prompt, dataframe, context):
+    def _generate_conversational_response(self, prompt, dataframe, context, stream=False):
         """Generate intelligent conversational responses about data"""
         
+        # Same question about the same dataset - reuse the earlier answer
+        cache_key = response_cache.make_key(get_profile(dataframe).fingerprint, prompt, MODEL, TEMPERATURE, "conversation")
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return {"type": "conversation", "content": cached}
+        
         full_prompt = f"""
         You are an expert data analyst. Answer the user's question about their dataset accurately using the COMPLETE dataset information provided.
         
@@ -116,33 +93,70 @@ class AIProcessor:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            request = dict(
+                model=MODEL,
                 messages=[
                     {"role": "user", "content": full_prompt}
                 ],
                 max_tokens=1000,
-                temperature=0.1  # Lower temperature for more accurate responses
+                temperature=TEMPERATURE
             )
             
+            if stream:
+                chunks = self.gateway.stream_chat_completion(**request)
+                return {"type": "stream", "content": self._stream_tokens(chunks, cache_key)}
+            
+            response = self.gateway.chat_completion(**request)
             content = response.choices[0].message.content.strip()
+            response_cache.put(cache_key, content)
             return {"type": "conversation", "content": content}
             
         except Exception as e:
             app_logger.error(f"OpenAI API error: {str(e)}", show_in_ui=False)
             return {"type": "error", "content": f"OpenAI API error: {str(e)}. Please check your API key and try again."}
     
+    def _stream_tokens(self, response, cache_key):
+        """Yield text chunks from a streaming completion, caching the full answer"""
+        parts = []
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            app_logger.error(f"OpenAI streaming error: {str(e)}", show_in_ui=False)
+            raise
+        
+        content = "".join(parts).strip()
+        if content:
+            response_cache.put(cache_key, content)
+    
     def _generate_and_execute_code(self, prompt, dataframe, context):
         """Generate code for visualizations and data analysis"""
         
+        profile = get_profile(dataframe)
+        # Code depends only on the schema, so any dataset with the same columns can reuse it
+        compiled_key = compiled_code_cache.make_key(profile, prompt)
+        compiled = compiled_code_cache.get(compiled_key)
+        if compiled is not None:
+            return self._code_result(compiled, len(dataframe))
+        
+        cache_key = response_cache.make_key(profile.fingerprint, prompt, MODEL, TEMPERATURE, "code")
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            try:
+                compiled = compile_generated_code(cached)
+                compiled_code_cache.put(compiled_key, compiled)
+                return self._code_result(compiled, len(dataframe))
+            except CodeValidationError as e:
+                app_logger.warning(f"Discarding cached code: {str(e)}", show_in_ui=False)
+        
         # Add data type information to help AI make better decisions
-        dtype_info = {}
-        for col in dataframe.columns:
-            dtype_info[col] = {
-                'type': str(dataframe[col].dtype),
-                'sample_values': dataframe[col].dropna().head(3).tolist(),
-                'unique_count': dataframe[col].nunique()
-            }
+        full_dtype_info = profile.dtype_info()
+        dtype_info = {col: full_dtype_info[col] for col in select_columns(profile, prompt)}
         
         code_prompt = f"""
         Generate Python code for data analysis/visualization using the provided dataset.
@@ -175,26 +189,97 @@ class AIProcessor:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            response = self.gateway.chat_completion(
+                model=MODEL,
                 messages=[
                     {"role": "system", "content": "Generate clean Python code for data visualization. ALWAYS use st.pyplot(fig) instead of plt.show(). Use proper matplotlib syntax with fig, ax = plt.subplots()."},
                     {"role": "user", "content": code_prompt}
                 ],
                 max_tokens=800,
-                temperature=0.1
+                temperature=TEMPERATURE
             )
             
             code = response.choices[0].message.content.strip()
             cleaned_code = self._clean_generated_code(code)
-            cleaned_code = self._validate_and_fix_code(cleaned_code)
+            compiled = compile_generated_code(cleaned_code)
+            compiled_code_cache.put(compiled_key, compiled)
+            response_cache.put(cache_key, compiled.source)
             
-            return {"type": "code", "content": cleaned_code}
+            return self._code_result(compiled, len(dataframe))
             
+        except CodeValidationError as e:
+            app_logger.error(f"Generated code rejected: {str(e)}", show_in_ui=False)
+            return {"type": "error", "content": f"Code generation failed: {str(e)}"}
         except Exception as e:
             app_logger.error(f"Code generation error: {str(e)}", show_in_ui=False)
             return {"type": "error", "content": f"Code generation failed: {str(e)}"}
     
+    def _generate_sql(self, prompt, dataframe, context):
+        """Ask the model for one DuckDB query over the table "data" """
+        profile = get_profile(dataframe)
+        cache_key = response_cache.make_key(profile.fingerprint, prompt, MODEL, TEMPERATURE, "sql")
+        query = response_cache.get(cache_key)
+        if query is not None:
+            return {"type": "code", "language": "sql", "content": query}
+        
+        full_dtype_info = profile.dtype_info()
+        dtype_info = {col: full_dtype_info[col] for col in select_columns(profile, prompt)}
+        
+        sql_prompt = f"""
+        Write one DuckDB SQL query that answers the request below.
+        
+        {context}
+        
+        DETAILED COLUMN INFORMATION:
+        {dtype_info}
+        
+        User request: {prompt}
+        
+        CRITICAL REQUIREMENTS:
+        - Query the table named data - it holds ALL rows of the dataset
+        - Quote column names with double quotes, e.g. "job_name"
+        - Return a small result: aggregate with GROUP BY, ORDER BY and LIMIT rather than listing rows
+        - For charts, put the category or date in the first column and the values after it
+        - Write a single SELECT statement only, no explanations
+        
+        Generate the SQL now:
+        """
+        
+        try:
+            response = self.gateway.chat_completion(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": "Generate a single DuckDB SQL SELECT statement. Output only SQL."},
+                    {"role": "user", "content": sql_prompt}
+                ],
+                max_tokens=500,
+                temperature=TEMPERATURE
+            )
+            query = clean_sql(response.choices[0].message.content)
+            sql_engine.validate(query)
+            response_cache.put(cache_key, query)
+            return {"type": "code", "language": "sql", "content": query}
+        except SQLValidationError as e:
+            app_logger.error(f"Generated SQL rejected: {str(e)}", show_in_ui=False)
+            return {"type": "error", "content": f"SQL generation failed: {str(e)}"}
+        except Exception as e:
+            app_logger.error(f"SQL generation error: {str(e)}", show_in_ui=False)
+            return {"type": "error", "content": f"SQL generation failed: {str(e)}"}
+    
+    def _code_result(self, compiled, rows):
+        """Code result with an execution plan for the rows the code will run on
+        
+        rows is the loaded frame's length, not profile.row_count: profiles of
+        partial table loads and samples describe the whole source.
+        """
+        return {
+            "type": "code",
+            "content": compiled.source,
+            "compiled": compiled.code,
+            "findings": compiled.findings,
+            "plan": plan_execution(compiled.findings, rows)
+        }
+    
     def _clean_generated_code(self, code):
         """Clean and prepare generated code"""
         # Remove markdown code blocks
@@ -207,93 +292,84 @@ class AIProcessor:
         
         return code.strip()
     
-    def _validate_and_fix_code(self, code):
-        """Validate and fix common issues in generated code"""
-        lines = code.split('\n')
-        fixed_lines = []
-        needs_matplotlib_setup = False
-        
-        # Check if code uses matplotlib but doesn't have proper setup
-        code_str = '\n'.join(lines)
-        if ('ax.' in code_str or 'plt.' in code_str) and 'fig, ax = plt.subplots' not in code_str:
-            needs_matplotlib_setup = True
-        
-        # Add matplotlib setup if needed
-        if needs_matplotlib_setup:
-            fixed_lines.append('import matplotlib.pyplot as plt')
-            fixed_lines.append('fig, ax = plt.subplots(figsize=(10, 8))')
-        
-        for line in lines:
-            # Skip lines that try to read CSV files
-            if any(forbidden in line.lower() for forbidden in ['pd.read_csv', 'read_csv', '.csv']):
-                continue
-            
-            # Skip data assignment lines that don't use the existing data
-            if line.strip().startswith('data =') and 'pd.read' in line:
-                continue
-                
-            # Replace any DataFrame creation with reference to existing data
-            if 'pd.DataFrame' in line and '=' in line:
-                continue
-            
-            # Fix common variable name issues - replace df with data
-            if 'df[' in line or 'df.' in line:
-                line = line.replace('df[', 'data[').replace('df.', 'data.')
-            
-            # Fix matplotlib display issues - replace plt.show() with st.pyplot(fig)
-            if 'plt.show()' in line:
-                line = line.replace('plt.show()', 'st.pyplot(fig)')
-            
-            # Skip duplicate matplotlib imports and setups
-            if line.strip() == 'import matplotlib.pyplot as plt' and needs_matplotlib_setup:
-                continue
-            if 'fig, ax = plt.subplots' in line and needs_matplotlib_setup:
-                continue
-            
-            fixed_lines.append(line)
+    def execute_code(self, code, dataframe, progress_callback=None, plan=None):
+        """Execute generated code (source or a precompiled code object) with better error handling
         
-        # Ensure st.pyplot(fig) is present if we have matplotlib code
-        final_code = '\n'.join(fixed_lines)
-        if ('fig, ax = plt.subplots' in final_code or 'ax.' in final_code) and 'st.pyplot' not in final_code:
-            fixed_lines.append('st.pyplot(fig)')
+        Code runs in a sandbox worker process when the pool is enabled
+        (SANDBOX_WORKERS > 0); its figures and tables are then replayed here.
+        An ExecutionPlan from the performance linter can refuse the run or
+        restrict it to a random sample. Outputs are cached by code and dataset
+        fingerprint; "outputs_key" refers to them in chart_renderer.cache.
+        """
+        if plan is not None and plan.action == REFUSE:
+            return {"success": False, "error": f"❌ {plan.reason}"}
+        
+        key = output_key(code, profile_cache.fingerprint(dataframe), plan.rows if plan is not None else None)
+        outputs = chart_renderer.cache.get(key)
+        if outputs is not None:
+            replay_outputs(outputs)
+            return {"success": True, "message": "Analysis completed successfully", "outputs_key": key}
+        
+        if plan is not None and plan.action == SAMPLE:
+            if plan.rows < len(dataframe):
+                dataframe = dataframe.sample(n=plan.rows, random_state=0)
+        
+        if sandbox_pool.enabled:
+            result = sandbox_pool.run(code, dataframe, progress_callback=progress_callback)
+        else:
+            # pandas options are process-wide, so no copy-on-write here: the code gets a private copy
+            result = run_captured(code, dataframe.copy())
+        
+        replay_outputs(result["outputs"])
+        if result["success"]:
+            chart_renderer.cache.put(key, result["outputs"])
+            return {"success": True, "message": "Analysis completed successfully", "outputs_key": key}
+        
+        app_logger.error(f"Code execution error: {result['error']}", show_in_ui=False)
+        return {"success": False, "error": self._friendly_error(result["error"])}
+    
+    def execute_sql(self, query, dataframe, progress_callback=None):
+        """Run a generated query in the SQL engine and show its result
+        
+        A single value is shown as text; other results as a table, plus a
+        bar or line chart when the result's shape suits one. Outputs are
+        cached like those of execute_code.
+        """
+        key = output_key("sql", query, profile_cache.fingerprint(dataframe))
+        outputs = chart_renderer.cache.get(key)
+        if outputs is not None:
+            replay_outputs(outputs)
+            return {"success": True, "message": "Query completed successfully", "outputs_key": key}
         
-        return '\n'.join(fixed_lines)
-
-    def execute_code(self, code, dataframe):
-        """Execute the generated code safely with better error handling"""
         try:
-            import matplotlib.pyplot as plt
-            import seaborn as sns
-            import numpy as np
-            import streamlit as st
-            
-            # Clear any previous plots
-            plt.clf()
-            
-            local_vars = {
-                'data': dataframe, 
-                'df': dataframe,  # Add df as alias
-                'st': st, 
-                'pd': __import__('pandas'),
-                'plt': plt, 
-                'sns': sns, 
-                'np': np
-            }
-            
-            # Execute the code
-            exec(code, {'__builtins__': __builtins__}, local_vars)
-            return {"success": True, "message": "Analysis completed successfully"}
-            
+            frame, truncated = sql_engine.run(query, dataframe, progress_callback=progress_callback)
         except Exception as e:
-            error_msg = str(e)
-            app_logger.error(f"Code execution error: {error_msg}", show_in_ui=False)
-            
-            # Provide more helpful error messages
-            if "could not convert string to float" in error_msg:
-                error_msg = "❌ Cannot perform numeric operations on text data. Please specify a numeric column or ask for categorical analysis instead."
-            elif "KeyError" in error_msg:
-                error_msg = "❌ Column not found. Please check the column name and try again."
-            elif "labels' must be of length" in error_msg:
-                error_msg = "❌ Chart labeling error. Please try a different visualization approach."
-            
-            return {"success": False, "error": error_msg}
\ No newline at end of file
+            app_logger.error(f"SQL execution error: {str(e)}", show_in_ui=False)
+            return {"success": False, "error": self._friendly_error(str(e))}
+        
+        if frame.shape == (1, 1):
+            outputs = [("call", "markdown", (f"**{frame.columns[0]}:** {frame.iat[0, 0]}",), {})]
+        else:
+            outputs = [("call", "dataframe", (frame,), {})]
+            if truncated:
+                outputs.append(("call", "caption", (f"Showing the first {len(frame):,} rows of the result",), {}))
+            chart = result_chart(frame)
+            if chart is not None:
+                draw, figsize = chart
+                outputs.append(("image", chart_renderer.render(output_key(key, "chart"), draw, figsize)))
+        
+        replay_outputs(outputs)
+        chart_renderer.cache.put(key, outputs)
+        return {"success": True, "message": "Query completed successfully", "outputs_key": key}
+    
+    def _friendly_error(self, error_msg):
+        """Provide more helpful error messages"""
+        if "could not convert string to float" in error_msg:
+            return "❌ Cannot perform numeric operations on text data. Please specify a numeric column or ask for categorical analysis instead."
+        elif "KeyError" in error_msg:
+            return "❌ Column not found. Please check the column name and try again."
+        elif "Binder Error" in error_msg and "not found" in error_msg:
+            return "❌ The query refers to a column that does not exist. Please check the column name and try again."
+        elif "labels' must be of length" in error_msg:
+            return "❌ Chart labeling error. Please try a different visualization approach."
+        return error_msg
@@ -0,0 +1,151 @@
+import hashlib
+import io
+import marshal
+import os
+import pickle
+import threading
+import types
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from matplotlib.figure import Figure
+from utils.logger import app_logger
+
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "4"))
+CHART_CACHE_MB = int(os.getenv("CHART_CACHE_MB", "128"))
+
+
+def output_key(*parts):
+    """Stable cache key from code, dataset fingerprint and chart parameters"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, types.CodeType):
+            part = marshal.dumps(part)
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _output_size(outputs):
+    size = 0
+    for output in outputs:
+        if output[0] == "image":
+            size += len(output[1])
+        else:
+            size += len(pickle.dumps(output))
+    return size
+
+
+class OutputCache:
+    """LRU cache of rendered chart outputs, bounded by their size in bytes.
+
+    Entries are lists of outputs as recorded by the sandbox: ("image", png)
+    or ("call", st_method, args, kwargs), so they can be replayed with
+    replay_outputs() on reruns and when showing chat history.
+    """
+
+    def __init__(self, max_mb=CHART_CACHE_MB):
+        self.max_bytes = max_mb * 1024 * 1024
+        self._entries = OrderedDict()  # key -> (outputs, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, outputs):
+        size = _output_size(outputs)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (outputs, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_mb": round(self._bytes / (1024 * 1024), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def draw_png(draw, figsize):
+    """Draw on a standalone Agg figure (no pyplot global state) and return PNG bytes"""
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    draw(fig, ax)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    """Renders charts on a thread pool and caches the PNG bytes"""
+
+    def __init__(self, workers=CHART_RENDER_WORKERS, cache=None):
+        self.cache = cache or OutputCache()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart-render")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, draw, figsize=(10, 6)):
+        """
+        Start rendering a chart unless it is cached or already being rendered
+
+        Args:
+            key: cache key, see output_key()
+            draw: callable(fig, ax) drawing on the given figure
+            figsize: figure size in inches
+
+        Returns:
+            Future: resolves to the PNG bytes
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            cached = self.cache.get(key)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached[0][1])
+                return future
+            future = self._executor.submit(self._render, key, draw, figsize)
+            self._inflight[key] = future
+            return future
+
+    def render(self, key, draw, figsize=(10, 6)):
+        """Blocking variant of submit()"""
+        return self.submit(key, draw, figsize).result()
+
+    def _render(self, key, draw, figsize):
+        try:
+            png = draw_png(draw, figsize)
+            self.cache.put(key, [("image", png)])
+            return png
+        except Exception as e:
+            app_logger.error(f"Chart rendering failed: {str(e)}", show_in_ui=False)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+# Global renderer shared by all sessions
+chart_renderer = ChartRenderer()
@@ -0,0 +1,180 @@
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+from components.response_cache import normalize_prompt
+from components.perf_linter import lint
+
+# Calls that read files - generated code must use the loaded 'data' instead
+FILE_READ_FUNCTIONS = {"open", "read_csv", "read_excel", "read_json", "read_parquet", "read_table",
+                       "read_sql", "read_pickle", "read_feather", "loadtxt", "genfromtxt", "load"}
+
+
+class CodeValidationError(Exception):
+    """Generated code could not be parsed or made safe to run"""
+
+
+class CompiledCode:
+    """Normalized source, its compiled code object and performance findings"""
+
+    def __init__(self, source, code, findings=None):
+        self.source = source
+        self.code = code
+        self.findings = findings or []
+
+
+def _call_name(node):
+    if isinstance(node, ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name):
+            return func.id
+        if isinstance(func, ast.Attribute):
+            return func.attr
+    return None
+
+
+def _is_attribute_call(node, owner, attr):
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == attr
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == owner
+    )
+
+
+_BLOCK_FIELDS = ("body", "orelse", "finalbody", "handlers")
+
+
+def _reads_files(stmt):
+    """True if the statement itself reads a file; nested blocks are filtered on their own"""
+    for field, value in ast.iter_fields(stmt):
+        if field in _BLOCK_FIELDS:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, ast.AST) and any(
+                _call_name(child) in FILE_READ_FUNCTIONS for child in ast.walk(item)
+            ):
+                return True
+    return False
+
+
+def _replaces_data(node):
+    """Assignments like `data = pd.DataFrame(...)` that would discard the loaded dataset"""
+    if not isinstance(node, ast.Assign):
+        return False
+    targets = {target.id for target in node.targets if isinstance(target, ast.Name)}
+    return bool(targets & {"data", "df"}) and _call_name(node.value) == "DataFrame"
+
+
+class _Normalizer(ast.NodeTransformer):
+    """Structural fixes: df -> data, plt.show() -> st.pyplot(fig), no file reads"""
+
+    def visit_Name(self, node):
+        if node.id == "df":
+            return ast.copy_location(ast.Name(id="data", ctx=node.ctx), node)
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if _is_attribute_call(node, "plt", "show"):
+            return ast.copy_location(_parse_expr("st.pyplot(fig)"), node)
+        return node
+
+    def generic_visit(self, node):
+        for field in ("body", "orelse", "finalbody"):
+            statements = getattr(node, field, None)
+            if isinstance(statements, list) and statements and isinstance(statements[0], ast.stmt):
+                kept = [stmt for stmt in statements if not (_reads_files(stmt) or _replaces_data(stmt))]
+                if not kept and field == "body" and not isinstance(node, ast.Module):
+                    kept = [ast.Pass()]
+                setattr(node, field, kept)
+        return super().generic_visit(node)
+
+
+def _parse_expr(source):
+    return ast.parse(source, mode="eval").body
+
+
+def compile_generated_code(source):
+    """
+    Parse, normalize and compile generated code
+
+    Args:
+        source: Python source produced by the model
+
+    Returns:
+        CompiledCode: normalized source plus the compiled code object
+
+    Raises:
+        CodeValidationError: if the code is not valid Python
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        raise CodeValidationError(f"Generated code is not valid Python (line {e.lineno}: {e.msg})")
+
+    tree = _Normalizer().visit(tree)
+    # Vectorize slow pandas patterns before anything runs
+    tree, findings = lint(tree)
+
+    nodes = list(ast.walk(tree))
+    uses_plotting = any(
+        isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in ("ax", "plt")
+        for node in nodes
+    )
+    has_subplots = any(_is_attribute_call(node, "plt", "subplots") for node in nodes)
+    has_st_pyplot = any(_is_attribute_call(node, "st", "pyplot") for node in nodes)
+
+    # Make sure plotting code has a figure to draw on and is displayed
+    if uses_plotting and not has_subplots:
+        setup = ast.parse("import matplotlib.pyplot as plt\nfig, ax = plt.subplots(figsize=(10, 8))").body
+        tree.body = setup + tree.body
+        has_subplots = True
+    if has_subplots and not has_st_pyplot:
+        tree.body.append(ast.Expr(_parse_expr("st.pyplot(fig)")))
+
+    tree = ast.fix_missing_locations(tree)
+    try:
+        code = compile(tree, "<generated>", "exec")
+    except (SyntaxError, ValueError) as e:
+        raise CodeValidationError(f"Generated code could not be compiled: {str(e)}")
+    return CompiledCode(ast.unparse(tree), code, findings)
+
+
+def schema_fingerprint(profile):
+    """Hash of column names and dtypes - code written for a schema works on any data with it"""
+    schema = repr([(col.name, col.dtype) for col in profile.columns])
+    return hashlib.blake2b(schema.encode(), digest_size=16).hexdigest()
+
+
+class CompiledCodeCache:
+    """LRU cache of CompiledCode keyed by (schema fingerprint, normalized prompt)"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(profile, prompt):
+        return (schema_fingerprint(profile), normalize_prompt(prompt))
+
+    def get(self, key):
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+            return compiled
+
+    def put(self, key, compiled):
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Global cache shared by all sessions
+compiled_code_cache = CompiledCodeCache()
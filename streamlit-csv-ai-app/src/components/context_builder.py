@@ -0,0 +1,198 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from components.data_profile import QUANTILES
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+DTYPE_INFO_TOKEN_BUDGET = int(os.getenv("DTYPE_INFO_TOKEN_BUDGET", "1000"))
+
+# Column names count more than the values seen in a column
+NAME_WEIGHT = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_SAMPLE_COLUMNS = 8
+
+
+def count_tokens(text):
+    """Token count with tiktoken when installed, else a ~4 chars/token estimate"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+def tokenize(text):
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    # Light stemming so "emails" matches "email_sent"
+    return [t[:-1] if len(t) > 3 and t.endswith("s") else t for t in tokens]
+
+
+class ColumnIndex:
+    """BM25 index over column names and their most frequent values"""
+
+    def __init__(self, profile):
+        self.columns = profile.column_names
+        # Rendered once so narrow datasets skip the budgeted path cheaply
+        self.full_context = profile.to_context()
+        self.full_tokens = count_tokens(self.full_context)
+        self.documents = []
+        for col in profile.columns:
+            terms = tokenize(col.name) * NAME_WEIGHT
+            for value, _ in col.top_values:
+                terms += tokenize(value)
+            self.documents.append(Counter(terms))
+
+        self.avg_length = sum(sum(doc.values()) for doc in self.documents) / max(len(self.documents), 1)
+        document_frequency = Counter()
+        for doc in self.documents:
+            document_frequency.update(doc.keys())
+        n = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (n - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_frequency.items()
+        }
+
+    def rank(self, question):
+        """Column names ordered by relevance; unmatched columns keep table order"""
+        query = set(tokenize(question or ""))
+        scores = []
+        for position, doc in enumerate(self.documents):
+            length = sum(doc.values())
+            score = 0.0
+            for term in query:
+                tf = doc.get(term, 0)
+                if tf:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / max(self.avg_length, 1))
+                    score += self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append((-score, position))
+        return [self.columns[position] for _, position in sorted(scores)]
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def get_column_index(profile, max_entries=16):
+    """Cached ColumnIndex for a profile.
+
+    Entries are checked against the profile object itself: register_provider
+    replaces the profile of a fingerprint, and the old index must not be used.
+    """
+    with _index_lock:
+        cached = _index_cache.get(profile.fingerprint)
+        if cached is not None and cached[0] is profile:
+            _index_cache.move_to_end(profile.fingerprint)
+            return cached[1]
+    index = ColumnIndex(profile)
+    with _index_lock:
+        _index_cache[profile.fingerprint] = (profile, index)
+        _index_cache.move_to_end(profile.fingerprint)
+        while len(_index_cache) > max_entries:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def rank_columns(profile, question):
+    return get_column_index(profile).rank(question)
+
+
+def describe_column(col):
+    """One compact line of statistics for a column"""
+    parts = [f"{col.name} ({col.dtype})"]
+    if col.kind == "numeric" and col.count:
+        median = col.quantiles.get(QUANTILES[1])
+        parts.append(
+            f"sum={_fmt(col.sum)}, mean={_fmt(col.mean)}, std={_fmt(col.std)}, "
+            f"min={_fmt(col.min)}, median={_fmt(median)}, max={_fmt(col.max)}"
+        )
+    elif col.top_values:
+        top = ", ".join(f"{value} ({count})" for value, count in col.top_values[:5])
+        parts.append(f"{'~' if col.unique_is_approximate else ''}{col.unique_count} unique, top: {top}")
+    if col.null_count:
+        parts.append(f"{col.null_count} missing")
+    return "- " + "; ".join(parts)
+
+
+def _fmt(value):
+    if value is None:
+        return "n/a"
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if number.is_integer():
+        return f"{int(number):,}"
+    return f"{number:,.4g}"
+
+
+def build_context(profile, question=None, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Build the dataset context for a prompt within a token budget
+
+    Narrow datasets get the full profile. Wide ones get a compact header and
+    then per-column statistics in order of relevance to the question until
+    the budget is spent.
+    """
+    index = get_column_index(profile)
+    if index.full_tokens <= budget:
+        return index.full_context
+
+    ranked = index.rank(question)
+    rows = profile.row_count
+
+    header = f"""
+        DATASET INFORMATION:
+        - Total rows: {rows:,}
+        - Total columns: {len(profile.columns)} ({len(profile.numeric_columns)} numeric, {len(profile.categorical_columns)} categorical)
+
+        IMPORTANT: This dataset contains {rows:,} rows of data. When calculating totals, sums, or counts, use ALL rows, not just the sample below.
+        The statistics below are for ALL rows. Columns are listed most relevant to the question first; not every column is shown.
+
+        SAMPLE DATA (first 3 rows, most relevant columns only):
+        {profile.sample_rows[ranked[:MAX_SAMPLE_COLUMNS]].to_string(index=False)}
+
+        COLUMN STATISTICS (ALL {rows:,} rows):
+        """
+    context = header
+    used = count_tokens(header)
+    included = 0
+    for name in ranked:
+        line = describe_column(profile.column(name)) + "\n"
+        cost = count_tokens(line)
+        if used + cost > budget:
+            break
+        context += line
+        used += cost
+        included += 1
+
+    omitted = ranked[included:]
+    if omitted:
+        names = ", ".join(omitted)
+        note = f"\nOther columns (statistics omitted): {names}\n"
+        if used + count_tokens(note) > budget:
+            note = f"\n{len(omitted)} further columns omitted.\n"
+        context += note
+    return context
+
+
+def select_columns(profile, question=None, budget=DTYPE_INFO_TOKEN_BUDGET):
+    """Most relevant columns whose dtype_info entries fit in the budget"""
+    dtype_info = profile.dtype_info()
+    selected = []
+    used = 0
+    for name in rank_columns(profile, question):
+        cost = count_tokens(repr({name: dtype_info[name]}))
+        if used + cost > budget and selected:
+            break
+        selected.append(name)
+        used += cost
+    return selected
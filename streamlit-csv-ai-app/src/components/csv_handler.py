@@ -1,13 +1,51 @@
+import os
+import re
 import pandas as pd
 import streamlit as st
 from utils.logger import app_logger
+from components.data_profile import profile_cache, compute_fingerprint
+from components.online_stats import StreamingProfiler
+from components.dataframe_cache import dataframe_cache, content_hash, frame_nbytes
+from components.dataset_store import dataset_store
+from components.sampling import RESERVOIR, ReservoirSampler, attach_sampling
 
-def load_csv(uploaded_file):
+try:
+    import pyarrow  # noqa: F401
+    DEFAULT_ENGINE = "pyarrow"
+except ImportError:
+    DEFAULT_ENGINE = "c"
+
+# Uploads larger than this are read in chunks with running statistics
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+DEFAULT_CHUNK_ROWS = 100000
+
+# Set to 1 to store repeated strings as categoricals. Off by default: generated
+# code that does string arithmetic (data[col] + ' x') fails on categoricals
+CSV_CATEGORICAL_STRINGS = os.getenv("CSV_CATEGORICAL_STRINGS", "0") == "1"
+# String columns with at most this share of distinct values become categoricals
+CATEGORICAL_RATIO = 0.5
+# Integers are not narrowed below 32 bits so column arithmetic in generated code stays safe
+MIN_INT_BYTES = 4
+DATETIME_NAME_PATTERN = re.compile(r"(_at|_on|date|time|timestamp)$", re.IGNORECASE)
+
+def load_csv(uploaded_file, chunksize=None, progress_callback=None, use_cache=True,
+             optimize_types=True, engine=None, sample_rows=None):
     """
     Load CSV file from Streamlit file uploader
     
     Args:
         uploaded_file: Streamlit uploaded file object
+        chunksize: Rows per chunk for streaming ingestion. Defaults to
+            streaming only for uploads above STREAMING_THRESHOLD_BYTES.
+        progress_callback: Optional callable receiving a 0-1 fraction
+            after each chunk when streaming
+        use_cache: Reuse a previously parsed frame for identical file contents
+        optimize_types: Convert columns to compact dtypes after parsing
+        engine: pandas CSV engine; defaults to the multithreaded pyarrow
+            parser when available (not used when streaming)
+        sample_rows: Keep a uniform random sample of this many rows
+            (reservoir sampling while streaming); statistics still cover
+            every row of the file
         
     Returns:
         pandas.DataFrame: Loaded CSV data
@@ -15,16 +53,160 @@ def load_csv(uploaded_file):
     app_logger.info(f"Attempting to load CSV file: {uploaded_file.name}")
     app_logger.debug(f"File size: {uploaded_file.size} bytes")
     
+    if chunksize is None and (sample_rows or uploaded_file.size > STREAMING_THRESHOLD_BYTES):
+        chunksize = DEFAULT_CHUNK_ROWS
+    
     try:
-        data = pd.read_csv(uploaded_file)
+        cache_key = None
+        seed = None
+        if use_cache:
+            mode = ("typed-categorical" if CSV_CATEGORICAL_STRINGS else "typed") if optimize_types else "raw"
+            if sample_rows:
+                mode += f"-sample{int(sample_rows)}"
+            digest = content_hash(uploaded_file)
+            # Same file, same sample: keeps cached profiles and answers valid
+            seed = int(digest[:8], 16)
+            cache_key = f"csv-{digest}-{mode}"
+            cached = dataframe_cache.get(cache_key)
+            if cached is not None:
+                app_logger.debug(f"CSV cache hit for {uploaded_file.name} - Shape: {cached.shape}")
+                return cached
+            uploaded_file.seek(0)
+        
+        if chunksize:
+            data = _load_csv_streaming(uploaded_file, chunksize, progress_callback, optimize_types,
+                                       sample_rows, seed)
+        else:
+            data = _read_csv(uploaded_file, engine or DEFAULT_ENGINE)
+            if optimize_types:
+                data = optimize_dtypes(data)
         app_logger.success(f"CSV file loaded successfully - Shape: {data.shape}")
         app_logger.debug(f"Columns: {list(data.columns)}")
+        
+        # Swap the private parse result for the shared memory-mapped copy
+        data = dataset_store.share(data)
+        if cache_key:
+            dataframe_cache.put(cache_key, data)
         return data
     except Exception as e:
         app_logger.error(f"Error loading CSV file: {str(e)}")
         st.error(f"Error loading CSV file: {str(e)}")
         return None
 
+def _read_csv(uploaded_file, engine):
+    """Read a whole CSV, falling back to the C parser if pyarrow rejects it"""
+    if engine == "pyarrow":
+        try:
+            return pd.read_csv(uploaded_file, engine="pyarrow")
+        except Exception as e:
+            app_logger.warning(f"pyarrow CSV engine failed, falling back to C parser: {str(e)}")
+            uploaded_file.seek(0)
+    return pd.read_csv(uploaded_file)
+
+def _load_csv_streaming(uploaded_file, chunksize, progress_callback=None, optimize_types=True,
+                        sample_rows=None, seed=None):
+    """Read a CSV in chunks, profiling each chunk as it arrives"""
+    profiler = StreamingProfiler()
+    sampler = ReservoirSampler(int(sample_rows), seed) if sample_rows else None
+    chunks = []
+    
+    for chunk in pd.read_csv(uploaded_file, chunksize=chunksize):
+        profiler.update(chunk)
+        if optimize_types:
+            # Narrow numbers per chunk so the accumulated chunks stay small
+            chunk = _downcast_numeric(chunk)
+        if sampler is not None:
+            sampler.update(chunk)
+        else:
+            chunks.append(chunk)
+        if progress_callback and uploaded_file.size:
+            progress_callback(min(uploaded_file.tell() / uploaded_file.size, 1.0))
+    
+    if sampler is not None and profiler.rows:
+        chunks = [sampler.result()]
+    if not chunks:
+        # Header-only file: nothing to profile
+        uploaded_file.seek(0)
+        return pd.read_csv(uploaded_file)
+    
+    data = pd.concat(chunks, ignore_index=True)
+    if optimize_types:
+        data = optimize_dtypes(data)
+    app_logger.debug(f"Streamed {profiler.rows} rows in {len(chunks)} chunks")
+    
+    # The profile is complete once the last chunk lands - seed the cache with it
+    profile = profiler.to_profile(data)
+    if sampler is not None and len(data) < profiler.rows:
+        attach_sampling(data, RESERVOIR, profiler.rows)
+        # Key the whole-file profile by the sample's own content, not the streamed rows
+        profile.fingerprint = compute_fingerprint(data)
+        profile.approximation_note = (
+            f"statistics cover all {profiler.rows:,} rows of the file; the loaded data is a "
+            f"random sample of {len(data):,} rows, and quantiles and distinct counts are estimated"
+        )
+    profile_cache.remember_fingerprint(data, profile.fingerprint)
+    profile_cache.put(profile.fingerprint, profile)
+    return data
+
+def optimize_dtypes(data, categorical_strings=None):
+    """
+    Convert columns to compact dtypes
+    
+    Integers are downcast (never below MIN_INT_BYTES) and date-like columns
+    (e.g. created_at) are parsed as datetimes. Floats are left at float64 so
+    totals keep full precision. Repeated strings become categoricals only
+    when opted in.
+    
+    Args:
+        data: pandas.DataFrame
+        categorical_strings: Convert string columns with at most
+            CATEGORICAL_RATIO distinct values to category (default:
+            CSV_CATEGORICAL_STRINGS)
+        
+    Returns:
+        pandas.DataFrame: Frame with compact dtypes; the before/after memory
+        usage is recorded in data.attrs["memory_report"]
+    """
+    if categorical_strings is None:
+        categorical_strings = CSV_CATEGORICAL_STRINGS
+    original_bytes = frame_nbytes(data)
+    data = _downcast_numeric(data)
+    
+    for col in data.columns:
+        series = data[col]
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        if DATETIME_NAME_PATTERN.search(str(col)):
+            parsed = pd.to_datetime(series, errors="coerce")
+            if parsed.notna().sum() >= series.notna().sum() * 0.95:
+                data[col] = parsed
+                continue
+        non_null = series.count()
+        if categorical_strings and non_null and series.nunique() <= non_null * CATEGORICAL_RATIO:
+            data[col] = series.astype("category")
+    
+    data.attrs["memory_report"] = {
+        "original_bytes": original_bytes,
+        "optimized_bytes": frame_nbytes(data)
+    }
+    app_logger.debug(f"Optimized dtypes: {original_bytes:,} -> {data.attrs['memory_report']['optimized_bytes']:,} bytes")
+    return data
+
+def _downcast_numeric(data):
+    """Downcast integer columns to the smallest safe width"""
+    data = data.copy(deep=False)
+    for col in data.select_dtypes(include=['integer']).columns:
+        series = data[col]
+        if series.empty:
+            continue
+        # Signed only: unsigned counters would wrap on subtraction (sent - delivered)
+        narrowed = pd.to_numeric(series, downcast="integer")
+        if narrowed.dtype.itemsize < MIN_INT_BYTES:
+            narrowed = narrowed.astype(f"int{MIN_INT_BYTES * 8}")
+        if narrowed.dtype.itemsize < series.dtype.itemsize:
+            data[col] = narrowed
+    return data
+
 def summarize_data(data):
     """
     Generate summary statistics for the DataFrame
@@ -42,12 +224,14 @@ def summarize_data(data):
         return {"error": "No data available"}
     
     try:
+        # Statistics come from the shared profile (parallel for wide frames)
+        profile = profile_cache.get_profile(data)
         summary = {
             "shape": data.shape,
             "columns": list(data.columns),
             "data_types": data.dtypes.to_dict(),
-            "missing_values": data.isnull().sum().to_dict(),
-            "numeric_summary": data.describe().to_dict() if len(data.select_dtypes(include=['number']).columns) > 0 else "No numeric columns"
+            "missing_values": profile.missing_values(),
+            "numeric_summary": profile.numeric_summary().to_dict() if profile.numeric_columns else "No numeric columns"
         }
         
         app_logger.success(f"Data summary generated - {data.shape[0]} rows, {data.shape[1]} columns")
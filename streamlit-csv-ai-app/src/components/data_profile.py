@@ -0,0 +1,308 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from utils.logger import app_logger
+
+# Column dtypes treated as categorical throughout the app
+CATEGORICAL_DTYPES = ['object', 'category', 'string']
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Frames at least this wide are profiled on the parallel profiler's thread pool
+PARALLEL_PROFILE_MIN_COLUMNS = int(os.getenv("PARALLEL_PROFILE_MIN_COLUMNS", "64"))
+
+
+class ColumnProfile:
+    """Statistics for a single column of a dataset"""
+
+    def __init__(self, name, dtype, kind):
+        self.name = name
+        self.dtype = dtype
+        self.kind = kind  # "numeric", "categorical" or "other"
+        self.count = 0
+        self.null_count = 0
+        self.unique_count = None
+        self.unique_is_approximate = False
+        self.sum = None
+        self.mean = None
+        self.std = None
+        self.min = None
+        self.max = None
+        self.quantiles = {}
+        self.top_values = []  # [(value, count), ...] most frequent first
+        self.sample_values = []
+
+    @property
+    def most_common(self):
+        return self.top_values[0][0] if self.top_values else "N/A"
+
+
+class DatasetProfile:
+    """Precomputed statistics for a whole dataset, used to build AI context"""
+
+    def __init__(self, fingerprint, row_count, columns, sample_rows):
+        self.fingerprint = fingerprint
+        self.row_count = row_count
+        self.columns = columns  # list of ColumnProfile, in DataFrame order
+        self.sample_rows = sample_rows  # small DataFrame (first rows)
+        self.approximate = False
+        self.approximation_note = "quantiles and distinct counts are estimated from a single streaming pass"
+        self._by_name = None
+
+    @classmethod
+    def from_dataframe(cls, dataframe, fingerprint=None):
+        """Profile a DataFrame, visiting each column once
+
+        Frames with at least PARALLEL_PROFILE_MIN_COLUMNS columns are
+        profiled in parallel column batches by the ParallelProfiler.
+        """
+        if len(dataframe.columns) >= PARALLEL_PROFILE_MIN_COLUMNS:
+            # Imported here: the parallel profiler builds on this module
+            from components.parallel_profiler import parallel_profiler
+            return parallel_profiler.profile(dataframe, fingerprint)
+
+        numeric_cols = set(dataframe.select_dtypes(include=['number']).columns)
+        categorical_cols = set(dataframe.select_dtypes(include=CATEGORICAL_DTYPES).columns)
+
+        columns = []
+        for col in dataframe.columns:
+            series = dataframe[col]
+            if col in numeric_cols:
+                kind = "numeric"
+            elif col in categorical_cols:
+                kind = "categorical"
+            else:
+                kind = "other"
+            columns.append(_profile_series(col, series, kind))
+
+        return cls(fingerprint, len(dataframe), columns, dataframe.head(3))
+
+    @property
+    def column_names(self):
+        return [col.name for col in self.columns]
+
+    @property
+    def numeric_columns(self):
+        return [col.name for col in self.columns if col.kind == "numeric"]
+
+    @property
+    def categorical_columns(self):
+        return [col.name for col in self.columns if col.kind == "categorical"]
+
+    def column(self, name):
+        if self._by_name is None:
+            self._by_name = {col.name: col for col in self.columns}
+        return self._by_name.get(name)
+
+    def numeric_summary(self):
+        """Return a describe()-style table for the numeric columns"""
+        rows = ['count', 'mean', 'std', 'min'] + [f"{int(q * 100)}%" for q in QUANTILES] + ['max']
+        summary = {}
+        for col in self.columns:
+            if col.kind != "numeric":
+                continue
+            values = [col.count, col.mean, col.std, col.min]
+            values += [col.quantiles.get(q, np.nan) for q in QUANTILES]
+            values.append(col.max)
+            summary[col.name] = [np.nan if v is None else v for v in values]
+        return pd.DataFrame(summary, index=rows)
+
+    def missing_values(self):
+        return {col.name: col.null_count for col in self.columns}
+
+    def dtype_info(self):
+        """Per-column type, sample values and unique count for code generation"""
+        return {
+            col.name: {
+                'type': col.dtype,
+                'sample_values': col.sample_values,
+                'unique_count': col.unique_count
+            }
+            for col in self.columns
+        }
+
+    def to_context(self):
+        """Render the profile as the dataset description sent to the model"""
+        numeric_cols = self.numeric_columns
+        categorical_cols = self.categorical_columns
+        rows = self.row_count
+
+        context = f"""
+        DATASET INFORMATION:
+        - Total rows: {rows:,}
+        - Total columns: {len(self.columns)}
+        - Column names: {self.column_names}
+        - Numeric columns: {numeric_cols}
+        - Categorical columns: {categorical_cols}
+
+        IMPORTANT: This dataset contains {rows:,} rows of data. When calculating totals, sums, or counts, use ALL rows, not just the sample below.
+
+        SAMPLE DATA (first 3 rows for reference only):
+        {self.sample_rows.to_string(index=False)}
+
+        FULL DATASET STATISTICS:
+        """
+
+        if numeric_cols:
+            context += f"\nNumeric column statistics (ALL {rows:,} rows):\n"
+            if self.approximate:
+                context += f"({self.approximation_note})\n"
+            context += self.numeric_summary().to_string()
+
+            context += f"\n\nCOLUMN TOTALS (sum of all {rows:,} rows):\n"
+            for name in numeric_cols:
+                context += f"{name}: {self.column(name).sum:,}\n"
+
+        if categorical_cols:
+            context += f"\nCategorical column information (ALL {rows:,} rows):\n"
+            for name in categorical_cols[:3]:  # First 3 categorical columns
+                col = self.column(name)
+                approx = "~" if col.unique_is_approximate else ""
+                context += f"{name}: {approx}{col.unique_count} unique values, most common: {col.most_common}\n"
+
+        context += f"\nDATA QUALITY (ALL {rows:,} rows):\n"
+        missing = [col for col in self.columns if col.null_count > 0]
+        if missing:
+            context += "Missing values:\n"
+            for col in missing:
+                context += f"  {col.name}: {col.null_count} missing ({col.null_count/max(rows, 1)*100:.1f}%)\n"
+        else:
+            context += "No missing values found.\n"
+
+        return context
+
+
+def _profile_series(name, series, kind):
+    """Compute all statistics for one column"""
+    col = ColumnProfile(name, str(series.dtype), kind)
+    non_null = series.dropna()
+    col.count = len(non_null)
+    col.null_count = len(series) - col.count
+    col.sample_values = non_null.head(3).tolist()
+
+    if kind == "numeric":
+        col.unique_count = non_null.nunique()
+        col.sum = non_null.sum()
+        if col.count > 0:
+            col.mean = non_null.mean()
+            col.std = non_null.std()
+            col.min = non_null.min()
+            col.max = non_null.max()
+            col.quantiles = dict(zip(QUANTILES, non_null.quantile(list(QUANTILES)).tolist()))
+    else:
+        counts = non_null.value_counts()
+        col.unique_count = len(counts)
+        col.top_values = list(counts.head(10).items())
+
+    return col
+
+
+def compute_fingerprint(dataframe):
+    """Content fingerprint of a DataFrame: schema plus a hash of every row"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((dataframe.shape, list(dataframe.columns), [str(t) for t in dataframe.dtypes])).encode())
+    row_hashes = pd.util.hash_pandas_object(dataframe, index=False)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ProfileCache:
+    """LRU cache of DatasetProfile objects keyed by DataFrame fingerprint.
+
+    Fingerprints are remembered per DataFrame object so that the same frame
+    (e.g. one kept in st.session_state) is only hashed once.
+    """
+
+    def __init__(self, max_entries=16, max_providers=64):
+        self.max_entries = max_entries
+        self.max_providers = max_providers
+        self._profiles = OrderedDict()
+        self._fingerprints = {}
+        self._providers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fingerprint(self, dataframe):
+        key = id(dataframe)
+        with self._lock:
+            entry = self._fingerprints.get(key)
+        if entry is not None:
+            ref, signature, fingerprint = entry
+            if ref() is dataframe and signature == _signature(dataframe):
+                return fingerprint
+
+        fingerprint = compute_fingerprint(dataframe)
+        self.remember_fingerprint(dataframe, fingerprint)
+        return fingerprint
+
+    def remember_fingerprint(self, dataframe, fingerprint):
+        """Associate a known fingerprint with a DataFrame object"""
+        key = id(dataframe)
+        ref = weakref.ref(dataframe, lambda _, key=key: self._forget(key))
+        with self._lock:
+            self._fingerprints[key] = (ref, _signature(dataframe), fingerprint)
+
+    def _forget(self, key):
+        with self._lock:
+            self._fingerprints.pop(key, None)
+
+    def get(self, fingerprint):
+        with self._lock:
+            profile = self._profiles.get(fingerprint)
+            if profile is not None:
+                self._profiles.move_to_end(fingerprint)
+            return profile
+
+    def put(self, fingerprint, profile):
+        with self._lock:
+            self._profiles[fingerprint] = profile
+            self._profiles.move_to_end(fingerprint)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def register_provider(self, fingerprint, provider):
+        """Build the profile for this fingerprint with provider(dataframe) instead of
+        profiling the frame itself, e.g. from database aggregates when the frame
+        only holds part of a table"""
+        with self._lock:
+            self._providers[fingerprint] = provider
+            self._providers.move_to_end(fingerprint)
+            while len(self._providers) > self.max_providers:
+                self._providers.popitem(last=False)
+            # A profile computed from the frame alone is superseded
+            self._profiles.pop(fingerprint, None)
+
+    def get_profile(self, dataframe):
+        """Return the cached profile for a DataFrame, computing it on a miss"""
+        fingerprint = self.fingerprint(dataframe)
+        profile = self.get(fingerprint)
+        if profile is None:
+            with self._lock:
+                provider = self._providers.get(fingerprint)
+            if provider is not None:
+                try:
+                    profile = provider(dataframe)
+                except Exception as e:
+                    app_logger.warning(f"Profile provider failed for {fingerprint}, profiling loaded rows: {str(e)}")
+            if profile is None:
+                app_logger.debug(f"Profiling dataset {fingerprint} - Shape: {dataframe.shape}")
+                profile = DatasetProfile.from_dataframe(dataframe, fingerprint)
+            self.put(fingerprint, profile)
+        return profile
+
+
+def _signature(dataframe):
+    """Cheap check that a remembered frame has not been reshaped in place"""
+    return (dataframe.shape, tuple(dataframe.columns))
+
+
+# Global profile cache shared by all sessions
+profile_cache = ProfileCache()
+
+
+def get_profile(dataframe):
+    return profile_cache.get_profile(dataframe)
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from utils.logger import app_logger
+
+try:
+    import pyarrow  # noqa: F401
+    SPILL_FORMAT = "parquet"
+except ImportError:
+    SPILL_FORMAT = "pickle"
+
+DEFAULT_MEMORY_BUDGET_MB = int(os.getenv("DATAFRAME_CACHE_MB", "1024"))
+DEFAULT_SPILL_DIR = (
+    os.getenv("DATAFRAME_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "fci_chatbot_cache")
+)
+
+
+def frame_nbytes(dataframe):
+    return int(dataframe.memory_usage(index=True, deep=True).sum())
+
+
+def content_hash(uploaded_file):
+    """SHA-256 of an uploaded file's bytes, memoized per Streamlit upload id"""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None and file_id in _upload_hashes:
+        return _upload_hashes[file_id]
+
+    digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    if file_id is not None:
+        _upload_hashes[file_id] = digest
+    return digest
+
+
+_upload_hashes = {}
+
+
+class DataFrameCache:
+    """Process-wide LRU cache of DataFrames with a memory budget.
+
+    Frames evicted from memory are spilled to a local columnar file, so a
+    later hit is a fast file read instead of re-parsing the source.
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, spill_dir=DEFAULT_SPILL_DIR):
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.spill_dir = spill_dir
+        self._frames = OrderedDict()  # key -> (DataFrame, nbytes)
+        self._memory_used = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            try:
+                dataframe = self._read_spill(path)
+            except Exception as e:
+                app_logger.warning(f"Could not read spilled frame {key}: {str(e)}")
+                with self._lock:
+                    self.misses += 1
+                return None
+            with self._lock:
+                self.spill_hits += 1
+            app_logger.debug(f"DataFrame cache: reloaded {key} from {path}")
+            self.put(key, dataframe, spilled=True)
+            return dataframe
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, dataframe, spilled=False):
+        nbytes = frame_nbytes(dataframe)
+        if nbytes > self.memory_budget:
+            # Too large to keep resident - keep only the on-disk copy
+            if not spilled:
+                self._spill(key, dataframe)
+            return
+
+        evicted = []
+        with self._lock:
+            if key in self._frames:
+                self._memory_used -= self._frames.pop(key)[1]
+            self._frames[key] = (dataframe, nbytes)
+            self._memory_used += nbytes
+            while self._memory_used > self.memory_budget and len(self._frames) > 1:
+                old_key, (old_frame, old_bytes) = self._frames.popitem(last=False)
+                self._memory_used -= old_bytes
+                evicted.append((old_key, old_frame))
+
+        for old_key, old_frame in evicted:
+            if not os.path.exists(self._spill_path(old_key)):
+                self._spill(old_key, old_frame)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._frames),
+                "memory_used": self._memory_used,
+                "memory_budget": self.memory_budget,
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+            }
+
+    def _spill_path(self, key):
+        extension = "parquet" if SPILL_FORMAT == "parquet" else "pkl"
+        return os.path.join(self.spill_dir, f"{key}.{extension}")
+
+    def _spill(self, key, dataframe):
+        path = self._spill_path(key)
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            if SPILL_FORMAT == "parquet":
+                dataframe.to_parquet(tmp_path, index=True)
+            else:
+                dataframe.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+            app_logger.debug(f"DataFrame cache: spilled {key} to {path}")
+        except Exception as e:
+            app_logger.warning(f"Could not spill frame {key}: {str(e)}")
+
+    def _read_spill(self, path):
+        if SPILL_FORMAT == "parquet":
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+
+# Global cache shared by all sessions
+dataframe_cache = DataFrameCache()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import threading
+import weakref
+
+from utils.logger import app_logger
+from components.data_profile import profile_cache
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Point this at /dev/shm to keep the shared files in RAM
+DEFAULT_STORE_DIR = (
+    os.getenv("DATASET_STORE_DIR") or os.path.join(tempfile.gettempdir(), "fci_chatbot_datasets")
+)
+
+
+def open_shared(path):
+    """Open a published dataset file as a read-only DataFrame backed by a memory map"""
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks avoids consolidating columns, which would copy them
+    return table.to_pandas(split_blocks=True)
+
+
+class DatasetStore:
+    """Shares one read-only, memory-mapped copy of each dataset.
+
+    Each dataset is written once to an Arrow IPC file keyed by its content
+    fingerprint. Every session (and every server process) then reads it through
+    a memory map, so numeric columns are zero-copy views of the same pages.
+    Frames are tracked with weak references: when the last session drops a
+    frame, its file is removed.
+    """
+
+    def __init__(self, root_dir=DEFAULT_STORE_DIR):
+        self.root_dir = root_dir
+        self._frames = {}  # key -> weakref to the shared DataFrame
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return pa is not None
+
+    def share(self, dataframe, key=None):
+        """Return the shared read-only frame for this dataset, publishing it if needed"""
+        if not self.available:
+            return dataframe
+
+        key = key or profile_cache.fingerprint(dataframe)
+        with self._lock:
+            ref = self._frames.get(key)
+            shared = ref() if ref is not None else None
+            if shared is not None:
+                return shared
+
+            try:
+                path = self._path(key)
+                if not os.path.exists(path):
+                    self._write(dataframe, path)
+                shared = open_shared(path)
+            except Exception as e:
+                app_logger.warning(f"Could not share dataset {key}, using private copy: {str(e)}")
+                return dataframe
+
+            shared.attrs.update(dataframe.attrs)
+            self._frames[key] = weakref.ref(shared)
+            weakref.finalize(shared, self._release, key, path)
+
+        profile_cache.remember_fingerprint(shared, key)
+        app_logger.debug(f"Dataset {key} shared from {path}")
+        return shared
+
+    def path_for(self, dataframe):
+        """Arrow file backing a shared frame, or None if the frame is not shared"""
+        if not self.available:
+            return None
+        key = profile_cache.fingerprint(dataframe)
+        with self._lock:
+            ref = self._frames.get(key)
+            if ref is not None and ref() is not None:
+                return self._path(key)
+        return None
+
+    def active_datasets(self):
+        with self._lock:
+            return [key for key, ref in self._frames.items() if ref() is not None]
+
+    def _path(self, key):
+        return os.path.join(self.root_dir, f"{key}.arrow")
+
+    def _write(self, dataframe, path):
+        os.makedirs(self.root_dir, exist_ok=True)
+        table = pa.Table.from_pandas(dataframe, preserve_index=None)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def _release(self, key, path):
+        with self._lock:
+            ref = self._frames.get(key)
+            if ref is not None and ref() is not None:
+                # Re-shared since this frame was created
+                return
+            self._frames.pop(key, None)
+            try:
+                os.remove(path)
+                app_logger.debug(f"Dataset {key} released")
+            except OSError:
+                # Still mapped by another process (or already removed)
+                pass
+
+
+# Global store shared by all sessions
+dataset_store = DatasetStore()
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import openai
+from utils.logger import app_logger
+from components.llm_client import get_openai_client
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+DOWN = "down"
+UNKNOWN = "unknown"
+
+DEFAULT_TTL_SECONDS = 60
+DEGRADED_LATENCY_SECONDS = 3.0
+PROBE_MODEL = "gpt-3.5-turbo"
+
+
+class HealthMonitor:
+    """Probes the LLM backend on a background thread and caches the result.
+
+    The probe is a model lookup, which checks the key and connectivity without
+    spending tokens. Reading status() never makes a network call.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL_SECONDS, degraded_latency=DEGRADED_LATENCY_SECONDS):
+        self.ttl = ttl
+        self.degraded_latency = degraded_latency
+        self._state = {"state": UNKNOWN, "latency": None, "checked_at": None, "error": None}
+        self._lock = threading.Lock()
+        self._checked = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def status(self, wait=0):
+        """Return the cached health state, starting the monitor if needed.
+
+        Args:
+            wait: Seconds to block for the very first probe result
+        """
+        self._ensure_started()
+        if wait and not self._checked.is_set():
+            self._checked.wait(wait)
+        with self._lock:
+            return dict(self._state)
+
+    def refresh(self, wait=0):
+        """Ask the background thread to probe again now.
+
+        Args:
+            wait: Seconds to block for the new probe result
+        """
+        self._ensure_started()
+        self._checked.clear()
+        self._wakeup.set()
+        if wait:
+            self._checked.wait(wait)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="llm-health-monitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            state = self.probe()
+            with self._lock:
+                self._state = state
+            self._checked.set()
+            self._wakeup.wait(self.ttl)
+            self._wakeup.clear()
+
+    def probe(self):
+        """Run one health probe and return the resulting state"""
+        started = time.perf_counter()
+        state, error = HEALTHY, None
+        try:
+            get_openai_client().models.retrieve(PROBE_MODEL)
+        except (openai.AuthenticationError, openai.PermissionDeniedError) as e:
+            state, error = DOWN, f"Invalid API key: {str(e)}"
+        except openai.RateLimitError as e:
+            state, error = DEGRADED, f"Rate limited: {str(e)}"
+        except openai.APIStatusError as e:
+            state = DEGRADED if e.status_code >= 500 else DOWN
+            error = f"API error {e.status_code}: {str(e)}"
+        except openai.APIConnectionError as e:
+            state, error = DOWN, f"Connection error: {str(e)}"
+        except Exception as e:
+            # Missing or malformed config.json
+            state, error = DOWN, f"Configuration error: {str(e)}"
+
+        latency = time.perf_counter() - started
+        if state == HEALTHY and latency > self.degraded_latency:
+            state = DEGRADED
+            error = f"Slow response ({latency:.1f}s)"
+        if state != HEALTHY:
+            app_logger.warning(f"LLM health check: {state} - {error}")
+
+        return {"state": state, "latency": latency, "checked_at": time.time(), "error": error}
+
+
+# Global monitor shared by all sessions
+health_monitor = HealthMonitor()
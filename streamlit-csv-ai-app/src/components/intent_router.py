@@ -0,0 +1,208 @@
+import re
+
+from components.data_profile import QUANTILES
+from components.sampling import sampling_info, estimate_total, estimate_mean
+
+# Requests that need generated code (charts and visual analysis)
+CODE_PATTERN = re.compile(
+    r"\b(plot|chart|graph|visuali[sz]e|visuali[sz]ation|histogram|pie|bar|scatter|line chart|"
+    r"box ?plot|heatmap|correlation|show distribution|create|make|generate|display chart|draw)s?\b"
+)
+
+# Words that may surround a simple question without changing its meaning
+FILLER_WORDS = {
+    "what", "whats", "is", "are", "the", "of", "in", "for", "a", "an", "how", "many", "much",
+    "there", "this", "that", "dataset", "data", "table", "file", "me", "show", "tell", "give",
+    "please", "can", "you", "column", "columns", "field", "fields", "value", "values", "all",
+    "do", "we", "have", "does", "it", "contain", "i", "my", "our", "overall", "list", "which",
+    "across", "entire", "whole", "s",
+}
+
+ROW_COUNT_WORDS = {"rows", "row", "records", "record", "entries", "entry", "lines", "count", "number", "size", "length"}
+COLUMN_LIST_WORDS = {"columns", "column", "fields", "names", "name", "types", "type", "schema", "structure"}
+
+AGGREGATES = {
+    "total": "sum", "sum": "sum",
+    "average": "mean", "avg": "mean", "mean": "mean",
+    "median": "median",
+    "minimum": "min", "min": "min", "lowest": "min", "smallest": "min",
+    "maximum": "max", "max": "max", "highest": "max", "largest": "max",
+}
+UNIQUE_WORDS = {"unique", "distinct", "different"}
+MISSING_WORDS = {"missing", "null", "nulls", "empty", "nan", "blank"}
+
+
+class Intent:
+    """Result of routing a prompt"""
+
+    ANSWER = "answer"              # answered locally, no LLM call
+    CODE = "code"                  # needs generated code
+    CONVERSATION = "conversation"  # free-form LLM answer
+
+    def __init__(self, kind, answer=None):
+        self.kind = kind
+        self.answer = answer
+
+
+def is_code_request(prompt):
+    return bool(CODE_PATTERN.search(prompt.lower()))
+
+
+def route_prompt(prompt, profile, dataframe=None):
+    """
+    Decide how to handle a prompt
+
+    Simple lookups (row count, column list, totals, averages, min/max,
+    distinct and missing counts of a named column) are answered from the
+    dataset profile, or a single pandas aggregation when the profile only
+    holds an estimate. When the data is a sample and the profile only
+    describes the sampled rows, counts, totals and averages are extrapolated
+    with a 95% margin of error. Anything else goes to the LLM.
+    """
+    if is_code_request(prompt):
+        return Intent(Intent.CODE)
+
+    answer = _answer_locally(prompt, profile, dataframe)
+    if answer is not None:
+        return Intent(Intent.ANSWER, answer)
+    return Intent(Intent.CONVERSATION)
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9_]+", text.lower())
+
+
+def _find_column(prompt_lower, profile):
+    """Longest column name mentioned in the prompt, as written or with spaces for underscores"""
+    best = None
+    for name in profile.column_names:
+        for variant in {str(name).lower(), str(name).lower().replace("_", " ")}:
+            if re.search(rf"(?<![a-z0-9_]){re.escape(variant)}(?![a-z0-9_])", prompt_lower):
+                if best is None or len(variant) > len(best[1]):
+                    best = (name, variant)
+    return best
+
+
+def _sample_only(profile, dataframe):
+    """Sampling info when the profile covers just the sampled rows, not the source"""
+    info = sampling_info(dataframe)
+    if info is not None and profile.row_count < info["population_rows"]:
+        return info
+    return None
+
+
+def _answer_locally(prompt, profile, dataframe):
+    prompt_lower = prompt.lower().strip()
+    match = _find_column(prompt_lower, profile)
+    sample = _sample_only(profile, dataframe)
+
+    if match is None:
+        # Column words are the subject here, not filler
+        words = set(_words(prompt_lower)) - (FILLER_WORDS - COLUMN_LIST_WORDS)
+        if words and words <= ROW_COUNT_WORDS and ("many" in prompt_lower or words & {"count", "number", "size", "length"}):
+            if sample is not None:
+                about = "about " if sample["population_is_estimate"] else ""
+                return (f"The dataset contains {about}**{sample['population_rows']:,}** records "
+                        f"({sample['sample_rows']:,} of them are loaded as a random sample).")
+            return f"The dataset contains **{profile.row_count:,}** records."
+        if words and words <= COLUMN_LIST_WORDS | {"their", "and", "main", "available"}:
+            return _describe_columns(profile)
+        if words & MISSING_WORDS and words <= MISSING_WORDS | {"any", "find", "check", "there"}:
+            return _describe_missing(profile)
+        return None
+
+    name, variant = match
+    remaining = set(_words(prompt_lower.replace(variant, " "))) - FILLER_WORDS
+    col = profile.column(name)
+    label = f"`{name}`"
+
+    aggregate_words = remaining & set(AGGREGATES)
+    if aggregate_words and remaining <= set(AGGREGATES):
+        if len({AGGREGATES[word] for word in aggregate_words}) != 1 or col.kind != "numeric":
+            return None
+        aggregate = AGGREGATES[aggregate_words.pop()]
+        if sample is not None:
+            return _extrapolate(aggregate, label, sample, dataframe, name)
+        value = _aggregate(aggregate, col, profile, dataframe, name)
+        if value is None:
+            return None
+        wording = {"sum": "total", "mean": "average", "median": "median", "min": "minimum", "max": "maximum"}[aggregate]
+        return f"The {wording} of {label} across all {profile.row_count:,} rows is **{_format(value)}**."
+
+    if sample is not None:
+        # Distinct and missing counts of a sample do not scale to the source
+        return None
+
+    # "number of x" alone may mean rows or non-null values: only answer explicit distinct/missing questions
+    if remaining & UNIQUE_WORDS and remaining <= UNIQUE_WORDS | {"number", "count"}:
+        unique = col.unique_count
+        if col.unique_is_approximate and dataframe is not None and len(dataframe) == profile.row_count:
+            unique = dataframe[name].nunique()
+        answer = f"{label} has **{unique:,}** distinct values."
+        if col.top_values:
+            top = ", ".join(f"{value} ({count:,})" for value, count in col.top_values[:5])
+            answer += f" The most common are: {top}."
+        return answer
+
+    if remaining & MISSING_WORDS and remaining <= MISSING_WORDS | {"any", "number", "count"}:
+        share = col.null_count / max(profile.row_count, 1) * 100
+        return f"{label} has **{col.null_count:,}** missing values ({share:.1f}% of {profile.row_count:,} rows)."
+
+    return None
+
+
+def _aggregate(aggregate, col, profile, dataframe, name):
+    """Aggregate from the profile, or one vectorized pass when the profile value is estimated"""
+    if aggregate == "median":
+        if profile.approximate:
+            # Only exact if the loaded frame holds every row (not a partial table load)
+            if dataframe is not None and len(dataframe) == profile.row_count:
+                return dataframe[name].median()
+            return None
+        return col.quantiles.get(QUANTILES[1])
+    return getattr(col, aggregate)
+
+
+def _extrapolate(aggregate, label, sample, dataframe, name):
+    """Whole-source total or average estimated from a sample, with its 95% margin"""
+    if aggregate == "sum":
+        value, margin = estimate_total(dataframe, name, sample)
+    elif aggregate == "mean":
+        value, margin = estimate_mean(dataframe, name, sample)
+    else:
+        # Extremes and medians of a sample are not estimates of the source's
+        return None
+    if value is None:
+        return None
+    wording = {"sum": "total", "mean": "average"}[aggregate]
+    about = "~" if sample["population_is_estimate"] else ""
+    return (f"The estimated {wording} of {label} across all {about}{sample['population_rows']:,} rows is "
+            f"**{_format(value)}** (± {_format(margin)} at 95% confidence, "
+            f"extrapolated from a random sample of {sample['sample_rows']:,} rows).")
+
+
+def _describe_columns(profile):
+    lines = [f"The dataset has **{len(profile.columns)}** columns:"]
+    for col in profile.columns:
+        lines.append(f"- `{col.name}` ({col.dtype})")
+    return "\n".join(lines)
+
+
+def _describe_missing(profile):
+    missing = [col for col in profile.columns if col.null_count > 0]
+    if not missing:
+        return f"Good news - there are no missing values in any of the {len(profile.columns)} columns."
+    lines = ["Columns with missing values:"]
+    for col in missing:
+        lines.append(f"- `{col.name}`: {col.null_count:,} missing ({col.null_count / max(profile.row_count, 1) * 100:.1f}%)")
+    return "\n".join(lines)
+
+
+def _format(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if number.is_integer():
+        return f"{int(number):,}"
+    return f"{number:,.2f}"
@@ -5,10 +5,16 @@ from langchain.memory import ConversationBufferMemory
 from langchain.tools import Tool
 from langchain.agents import initialize_agent
 import pandas as pd
+from components.llm_client import get_api_key, get_http_client
 
 class LangChainProcessor:
-    def __init__(self, api_key):
-        self.llm = OpenAI(openai_api_key=api_key, temperature=0.1)
+    def __init__(self, api_key=None):
+        # Reuse the process-wide settings and HTTP connection pool
+        self.llm = OpenAI(
+            openai_api_key=api_key or get_api_key(),
+            temperature=0.1,
+            http_client=get_http_client()
+        )
         self.memory = ConversationBufferMemory(memory_key="chat_history")
         
     def create_dataframe_agent(self, dataframe):
@@ -0,0 +1,97 @@
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI
+from utils.security import load_api_key
+from utils.logger import app_logger
+
+# Keep-alive connection pool shared by every session in this process
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 120
+REQUEST_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_lock = threading.Lock()
+_api_key = None
+_http_client = None
+_openai_client = None
+_requests_session = None
+
+
+def get_api_key():
+    """Load the OpenAI API key once per process"""
+    global _api_key
+    if _api_key is None:
+        with _lock:
+            if _api_key is None:
+                _api_key = load_api_key()
+    return _api_key
+
+
+def get_http_client():
+    """Shared httpx client with keep-alive pooling for OpenAI traffic"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY
+                    ),
+                    timeout=REQUEST_TIMEOUT
+                )
+    return _http_client
+
+
+def get_openai_client():
+    """Process-wide OpenAI client reused by every processor and session"""
+    global _openai_client
+    if _openai_client is None:
+        api_key = get_api_key()
+        http_client = get_http_client()
+        with _lock:
+            if _openai_client is None:
+                _openai_client = OpenAI(api_key=api_key, http_client=http_client)
+                app_logger.info("Shared OpenAI client created", show_in_ui=False)
+    return _openai_client
+
+
+def create_async_http_client():
+    """New httpx async client with the same pool limits (one per event loop)"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=REQUEST_TIMEOUT
+    )
+
+
+def get_requests_session():
+    """Shared requests session (for Ollama) with a pooled HTTP adapter"""
+    global _requests_session
+    if _requests_session is None:
+        with _lock:
+            if _requests_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_KEEPALIVE_CONNECTIONS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _requests_session = session
+    return _requests_session
+
+
+def reset_clients():
+    """Drop cached settings and clients, e.g. after config.json changes"""
+    global _api_key, _http_client, _openai_client, _requests_session
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        if _requests_session is not None:
+            _requests_session.close()
+        _api_key = _http_client = _openai_client = _requests_session = None
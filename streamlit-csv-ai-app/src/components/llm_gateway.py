@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from utils.logger import app_logger
+from components.llm_client import get_api_key, create_async_http_client
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 20.0
+
+_STREAM_END = object()
+
+
+class RetryableHTTPStatus(Exception):
+    """Raised for 429/5xx responses from backends without their own exceptions (Ollama)"""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} from {response.request.url}")
+        self.response = response
+
+
+def _is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, RetryableHTTPStatus)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return min(float(response.headers.get("retry-after")), BACKOFF_CAP_SECONDS)
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_key(kind, payload):
+    return hashlib.sha256(json.dumps([kind, payload], sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMGateway:
+    """Single entry point for model calls, running on a private asyncio loop.
+
+    - a semaphore bounds the number of concurrent backend requests
+    - 429/5xx/connection errors are retried with jittered exponential backoff
+    - identical requests already in flight are coalesced (single-flight)
+
+    Streamlit script threads call the blocking methods below; the work is
+    scheduled on the gateway's loop thread.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._loop = None
+        self._lock = threading.Lock()
+        # The members below are only touched from the loop thread
+        self._semaphore = None
+        self._inflight = {}
+        self._openai = None
+        self._http = None
+
+    def chat_completion(self, **kwargs):
+        """Blocking OpenAI chat completion through the gateway"""
+        key = _request_key("openai", kwargs)
+        return self._submit(self._single_flight(key, lambda: self._openai_create(kwargs))).result()
+
+    def stream_chat_completion(self, **kwargs):
+        """Start a streaming chat completion and return an iterator of chunks.
+
+        Returns once the backend has accepted the request, so connection and
+        authentication errors are raised here rather than mid-iteration.
+        """
+        chunks = queue.Queue()
+        future = self._submit(self._pump_stream(kwargs, chunks))
+        first = chunks.get()
+        if isinstance(first, BaseException):
+            raise first
+        return self._drain_stream(first, chunks, future)
+
+    def ollama_generate(self, url, payload, timeout=30):
+        """Blocking Ollama generate call; returns the decoded JSON body"""
+        key = _request_key("ollama", [url, payload])
+        return self._submit(self._single_flight(key, lambda: self._ollama_post(url, payload, timeout))).result()
+
+    def reset(self):
+        """Drop the backend clients so the next call reloads settings"""
+        if self._loop is not None:
+            self._submit(self._reset()).result()
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="llm-gateway", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _get_openai(self):
+        if self._openai is None:
+            # Retries are handled by the gateway, not the SDK
+            self._openai = AsyncOpenAI(api_key=get_api_key(), http_client=self._get_http(), max_retries=0)
+        return self._openai
+
+    def _get_http(self):
+        if self._http is None:
+            self._http = create_async_http_client()
+        return self._http
+
+    async def _reset(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._openai = None
+
+    async def _single_flight(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._with_retry(factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            app_logger.debug(f"LLM gateway: joined in-flight request {key[:12]}")
+        # shield: one caller giving up must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _with_retry(self, factory, use_semaphore=True):
+        attempt = 0
+        while True:
+            try:
+                if use_semaphore:
+                    async with self._get_semaphore():
+                        return await factory()
+                return await factory()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    # Full jitter: uniform in [0, base * 2^attempt], capped
+                    delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                attempt += 1
+                app_logger.warning(f"LLM request failed ({str(e)}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _openai_create(self, kwargs):
+        return await self._get_openai().chat.completions.create(**kwargs)
+
+    async def _ollama_post(self, url, payload, timeout):
+        response = await self._get_http().post(url, json=payload, timeout=timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableHTTPStatus(response)
+        response.raise_for_status()
+        return response.json()
+
+    async def _pump_stream(self, kwargs, chunks):
+        stream = None
+        try:
+            # Hold a concurrency slot for the whole stream, not just the request
+            async with self._get_semaphore():
+                stream = await self._with_retry(
+                    lambda: self._get_openai().chat.completions.create(stream=True, **kwargs),
+                    use_semaphore=False
+                )
+                async for chunk in stream:
+                    chunks.put(chunk)
+            chunks.put(_STREAM_END)
+        except asyncio.CancelledError:
+            if stream is not None:
+                await stream.close()
+            raise
+        except Exception as e:
+            chunks.put(e)
+
+    def _drain_stream(self, first, chunks, future):
+        item = first
+        try:
+            while item is not _STREAM_END:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+                item = chunks.get()
+        finally:
+            # Stop pulling tokens if the consumer went away early
+            future.cancel()
+
+
+# Global gateway shared by all sessions
+llm_gateway = LLMGateway()
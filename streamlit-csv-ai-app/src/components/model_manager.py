@@ -1,19 +1,18 @@
-import requests
 import json
-from openai import OpenAI
-from utils.security import load_api_key
 from utils.logger import app_logger
+from components.llm_client import get_api_key, get_requests_session
+from components.llm_gateway import llm_gateway
 
 class ModelManager:
     def __init__(self):
-        self.openai_client = None
+        self.openai_ready = False
         self.ollama_url = "http://localhost:11434/api/generate"
         self.current_model = "openai"
         
     def initialize_openai(self):
         try:
-            api_key = load_api_key()
-            self.openai_client = OpenAI(api_key=api_key)
+            get_api_key()
+            self.openai_ready = True
             return True
         except Exception as e:
             app_logger.error(f"Failed to initialize OpenAI: {str(e)}", show_in_ui=False)
@@ -21,7 +20,7 @@ class ModelManager:
     
     def test_ollama_connection(self):
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = get_requests_session().get("http://localhost:11434/api/tags", timeout=5)
             return response.status_code == 200
         except:
             return False
@@ -34,11 +33,11 @@ class ModelManager:
     
     def _generate_openai_response(self, prompt):
         try:
-            if not self.openai_client:
+            if not self.openai_ready:
                 if not self.initialize_openai():
                     return None
             
-            response = self.openai_client.chat.completions.create(
+            response = llm_gateway.chat_completion(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=1500,
@@ -56,10 +55,8 @@ class ModelManager:
                 "prompt": prompt,
                 "stream": False
             }
-            response = requests.post(self.ollama_url, json=payload, timeout=30)
-            if response.status_code == 200:
-                return response.json().get("response", "").strip()
-            return None
+            body = llm_gateway.ollama_generate(self.ollama_url, payload, timeout=30)
+            return body.get("response", "").strip()
         except Exception as e:
             app_logger.error(f"Ollama API error: {str(e)}", show_in_ui=False)
             return None
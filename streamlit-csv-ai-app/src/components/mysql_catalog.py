@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+
+from utils.logger import app_logger
+from components.sql_profile import quote_identifier
+
+MYSQL_CATALOG_TTL_SECONDS = float(os.getenv("MYSQL_CATALOG_TTL_SECONDS", "300"))
+
+TABLES_QUERY = """
+    SELECT TABLE_NAME, TABLE_TYPE, TABLE_ROWS, DATA_LENGTH, UPDATE_TIME
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME
+"""
+
+# Same fields as DESCRIBE: Field, Type, Null, Key, Default, Extra
+COLUMNS_QUERY = """
+    SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+
+class TableMetadata:
+    """Catalog entry for one table or view"""
+
+    def __init__(self, name, table_type, estimated_rows, data_length, update_time):
+        self.name = name
+        self.table_type = table_type
+        self.estimated_rows = estimated_rows  # InnoDB statistics estimate; None for views
+        self.data_length = data_length
+        self.update_time = update_time
+        self.columns = []
+        self.exact_rows = None
+        self.exact_rows_at = None
+
+
+class TableCatalog:
+    """Cached table and column metadata for one database, read from information_schema.
+
+    The whole schema is loaded with two queries and kept for ttl seconds.
+    Row counts are InnoDB's estimates; an exact COUNT(*) runs only on request
+    and is cached for the same ttl.
+    """
+
+    def __init__(self, pool, ttl=MYSQL_CATALOG_TTL_SECONDS):
+        self.pool = pool
+        self.ttl = ttl
+        self._tables = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def tables(self):
+        """Table names in the database"""
+        return list(self._snapshot())
+
+    def table(self, name):
+        """TableMetadata for a table, or None if it does not exist"""
+        return self._snapshot().get(name)
+
+    def table_info(self, name, exact=False):
+        """
+        Columns and row count of a table
+
+        Returns:
+            dict: {"columns", "row_count", "row_count_is_estimate", "update_time"},
+            or None if the table does not exist
+        """
+        table = self.table(name)
+        if table is None:
+            return None
+
+        now = time.monotonic()
+        if exact and (table.exact_rows is None or now - table.exact_rows_at > self.ttl):
+            table.exact_rows = self._exact_count(name)
+            table.exact_rows_at = now
+
+        if table.exact_rows is not None and now - table.exact_rows_at <= self.ttl:
+            row_count, estimate = table.exact_rows, False
+        else:
+            row_count, estimate = table.estimated_rows, True
+        return {
+            "columns": table.columns,
+            "row_count": row_count,
+            "row_count_is_estimate": estimate,
+            "update_time": table.update_time
+        }
+
+    def invalidate(self):
+        """Forget cached metadata, e.g. after tables were created or altered"""
+        with self._lock:
+            self._tables = None
+
+    def _snapshot(self):
+        with self._lock:
+            if self._tables is not None and time.monotonic() - self._loaded_at <= self.ttl:
+                return self._tables
+        tables = self._load()
+        with self._lock:
+            self._tables = tables
+            self._loaded_at = time.monotonic()
+        return tables
+
+    def _load(self):
+        def fetch(connection):
+            cursor = connection.cursor()
+            cursor.execute(TABLES_QUERY)
+            table_rows = cursor.fetchall()
+            cursor.execute(COLUMNS_QUERY)
+            column_rows = cursor.fetchall()
+            cursor.close()
+            return table_rows, column_rows
+
+        table_rows, column_rows = self.pool.run(fetch)
+        tables = {}
+        for name, table_type, estimated_rows, data_length, update_time in table_rows:
+            tables[name] = TableMetadata(name, table_type, estimated_rows, data_length, update_time)
+        for table_name, *column in column_rows:
+            if table_name in tables:
+                tables[table_name].columns.append(tuple(column))
+        app_logger.debug(f"Loaded catalog: {len(tables)} tables, {len(column_rows)} columns")
+        return tables
+
+    def _exact_count(self, name):
+        def fetch(connection):
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {quote_identifier(name)}")
+            count = cursor.fetchone()[0]
+            cursor.close()
+            return count
+        return self.pool.run(fetch)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(pool):
+    """Catalog for the database behind a connection pool, shared by all sessions"""
+    with _catalogs_lock:
+        catalog = _catalogs.get(pool)
+        if catalog is None:
+            catalog = TableCatalog(pool)
+            _catalogs[pool] = catalog
+        return catalog
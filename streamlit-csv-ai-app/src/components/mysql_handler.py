@@ -1,102 +1,386 @@
+import math
+import os
+import random
+import re
+from decimal import Decimal
+
 import mysql.connector
 import pandas as pd
 import streamlit as st
 from utils.logger import app_logger
+from components.mysql_pool import get_pool, PoolTimeout
+from components.csv_handler import optimize_dtypes, _downcast_numeric
+from components.data_profile import profile_cache
+from components.sql_profile import profile_table, quote_identifier
+from components.mysql_catalog import get_catalog
+from components.query_cache import query_cache
+from components.sampling import (
+    UNIFORM, STRATIFIED, MAX_STRATA, PROBE_BATCH, attach_sampling, probe_ids, stratum_allocation
+)
+
+# Rows per fetchmany() call when streaming a table
+MYSQL_FETCH_ROWS = int(os.getenv("MYSQL_FETCH_ROWS", "50000"))
+# Rounds of primary-key probing before a uniform sample settles for fewer rows
+MAX_PROBE_ROUNDS = 4
+# The sampling scan stops after this many times the requested rows
+SCAN_LIMIT_FACTOR = 2
+# Keys probed per requested row, at most, over all rounds
+MAX_PROBES_PER_ROW = 20
+# Below this fraction of existing keys a RAND() scan is cheaper than probing
+MIN_PROBE_HIT_RATE = 0.1
+INTEGER_TYPE = re.compile(r"^(tiny|small|medium|big)?int\b", re.IGNORECASE)
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = None
+
+
+class LoadCancelled(Exception):
+    """A streaming table load was stopped before it finished"""
+
+
+def _compact_chunk(chunk):
+    """Narrow a fetched chunk: DECIMAL -> float64, text -> Arrow strings, smaller ints"""
+    for col in chunk.columns:
+        series = chunk[col]
+        if not pd.api.types.is_object_dtype(series):
+            continue
+        first = series.first_valid_index()
+        if first is None:
+            continue
+        value = series[first]
+        if isinstance(value, Decimal):
+            chunk[col] = pd.to_numeric(series, errors="coerce").astype("float64")
+        elif isinstance(value, str) and STRING_DTYPE is not None:
+            try:
+                chunk[col] = series.astype(STRING_DTYPE)
+            except (TypeError, ValueError):
+                # Mixed types in the column: leave it as objects
+                pass
+    return _downcast_numeric(chunk)
+
+
+def _stream_query(connection, query, params, table_name, progress_callback=None, cancel_event=None,
+                  expected_rows=None, chunk_rows=MYSQL_FETCH_ROWS, loaded_before=0):
+    """Run a query on an unbuffered cursor and build a compact frame chunk by chunk"""
+    cursor = connection.cursor(buffered=False)
+    cursor.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    chunks = []
+    loaded = loaded_before
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            # Unread rows: the pool discards this connection
+            raise LoadCancelled(f"Load of {table_name} cancelled after {loaded:,} rows")
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        chunks.append(_compact_chunk(pd.DataFrame.from_records(rows, columns=columns)))
+        loaded += len(rows)
+        if progress_callback:
+            progress_callback(loaded, expected_rows)
+    cursor.close()
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
+
 
 class MySQLHandler:
+    """Per-session handle on a shared, process-wide connection pool"""
+
     def __init__(self):
-        self.connection = None
+        self.pool = None
         self.is_connected = False
     
     def connect_to_mysql(self, host, username, password, database, port=3306):
         """Connect to MySQL database"""
         try:
-            self.connection = mysql.connector.connect(
-                host=host,
-                user=username,
-                password=password,
-                database=database,
-                port=port
-            )
+            pool = get_pool(host, username, password, database, port)
+            # Check out once so bad credentials fail here, not on first use
+            with pool.connection():
+                pass
+            self.pool = pool
             self.is_connected = True
             app_logger.info(f"Successfully connected to MySQL database: {database}")
             return True, "Connected successfully!"
-        except mysql.connector.Error as e:
+        except (mysql.connector.Error, PoolTimeout) as e:
             app_logger.error(f"MySQL connection error: {str(e)}")
             self.is_connected = False
             return False, f"Connection failed: {str(e)}"
     
     def get_tables(self):
-        """Get list of tables in the database"""
+        """Get list of tables in the database (cached catalog)"""
         if not self.is_connected:
             return []
         
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SHOW TABLES")
-            tables = [table[0] for table in cursor.fetchall()]
-            cursor.close()
-            return tables
-        except mysql.connector.Error as e:
+            return get_catalog(self.pool).tables()
+        except (mysql.connector.Error, PoolTimeout) as e:
             app_logger.error(f"Error getting tables: {str(e)}")
             return []
     
-    def get_table_info(self, table_name):
-        """Get information about a specific table"""
+    def get_table_info(self, table_name, exact_count=False):
+        """Get information about a specific table
+        
+        The row count is InnoDB's estimate ("row_count_is_estimate": True)
+        unless exact_count is set, which runs a COUNT(*) and caches it.
+        """
         if not self.is_connected:
             return None
         
         try:
-            cursor = self.connection.cursor()
-            # Escape table name with backticks to handle spaces and special characters
-            escaped_table = f"`{table_name}`"
-            cursor.execute(f"DESCRIBE {escaped_table}")
-            columns = cursor.fetchall()
-            
-            cursor.execute(f"SELECT COUNT(*) FROM {escaped_table}")
-            row_count = cursor.fetchone()[0]
-            
-            cursor.close()
-            
-            return {
-                "columns": columns,
-                "row_count": row_count
-            }
-        except mysql.connector.Error as e:
+            return get_catalog(self.pool).table_info(table_name, exact=exact_count)
+        except (mysql.connector.Error, PoolTimeout) as e:
             app_logger.error(f"Error getting table info for {table_name}: {str(e)}")
             return None
     
-    def load_table_data(self, table_name, limit=1000):
-        """Load data from a table"""
+    def refresh_metadata(self):
+        """Drop cached table metadata for this database"""
+        if self.pool:
+            get_catalog(self.pool).invalidate()
+    
+    def load_table_data(self, table_name, limit=1000, progress_callback=None, cancel_event=None,
+                        expected_rows=None, chunk_rows=MYSQL_FETCH_ROWS):
+        """
+        Load data from a table, streaming it in chunks
+        
+        Rows are pulled from an unbuffered cursor with fetchmany(), so only one
+        chunk of Python row tuples exists at a time. Each chunk is converted to
+        compact column types before the next one is fetched. Results are
+        served from the query cache while the table is unchanged.
+        
+        Args:
+            table_name: table to load
+            limit: maximum rows, or None for the whole table
+            progress_callback: called with (rows_loaded, expected_rows) after each chunk;
+                an exception raised from it (e.g. a Streamlit rerun) stops the load
+            cancel_event: threading.Event that stops the load when set
+            expected_rows: total used for progress reporting
+            chunk_rows: rows per fetchmany() call
+            
+        Returns:
+            pandas.DataFrame, or None on error or cancellation
+        """
         if not self.is_connected:
             return None
         
+        # Escape table name with backticks to handle spaces and special characters
+        escaped_table = f"`{table_name}`"
+        query = f"SELECT * FROM {escaped_table}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        if expected_rows is not None and limit is not None:
+            expected_rows = min(expected_rows, limit)
+        
         try:
-            # Escape table name with backticks to handle spaces and special characters
-            escaped_table = f"`{table_name}`"
-            query = f"SELECT * FROM {escaped_table} LIMIT {limit}"
-            df = pd.read_sql(query, self.connection)
-            app_logger.info(f"Loaded {len(df)} rows from table {table_name}")
+            cache_key, df = query_cache.lookup(self.pool, query)
+            if df is not None:
+                app_logger.info(f"Loaded {len(df)} rows from table {table_name} (cached)")
+            else:
+                with self.pool.connection() as connection:
+                    df = _stream_query(connection, query, None, table_name, progress_callback,
+                                       cancel_event, expected_rows, chunk_rows)
+                df = optimize_dtypes(df)
+                query_cache.store(cache_key, df)
+                app_logger.info(f"Loaded {len(df)} rows from table {table_name}")
+            if limit is not None and len(df) >= limit:
+                # Only part of the table is loaded: describe the rest with SQL aggregates
+                self.register_table_profile(table_name, df)
             return df
+        except LoadCancelled as e:
+            app_logger.info(str(e))
+            return None
         except Exception as e:
             app_logger.error(f"Error loading table data from {table_name}: {str(e)}")
             return None
     
+    def load_table_sample(self, table_name, rows, method=UNIFORM, stratify_column=None,
+                          progress_callback=None, cancel_event=None, seed=None):
+        """
+        Load a random sample of a table instead of its first rows
+        
+        Uniform samples probe random values of an integer primary key (index
+        lookups only) and fall back to a RAND() filter on tables without one.
+        Stratified samples count the rows of every stratum of stratify_column,
+        then draw from each in proportion (at least MIN_STRATUM_ROWS each).
+        The frame's attrs["sampling"] records the population and scale factors.
+        
+        Args:
+            table_name: table to sample
+            rows: target sample size
+            method: sampling.UNIFORM or sampling.STRATIFIED
+            stratify_column: categorical column for stratified samples
+            progress_callback, cancel_event: as for load_table_data
+            seed: random seed for a reproducible sample
+            
+        Returns:
+            pandas.DataFrame, or None on error or cancellation
+        """
+        if not self.is_connected:
+            return None
+        
+        try:
+            with self.pool.connection() as connection:
+                if method == STRATIFIED:
+                    df, sampling = self._stratified_sample(connection, table_name, stratify_column, rows,
+                                                           progress_callback, cancel_event)
+                else:
+                    df, sampling = self._uniform_sample(connection, table_name, rows, seed,
+                                                        progress_callback, cancel_event)
+            df = optimize_dtypes(df)
+            attach_sampling(df, method, **sampling)
+            app_logger.info(f"Sampled {len(df)} of ~{sampling['population_rows']:,} rows from table {table_name} ({method})")
+            # Exact whole-table statistics still come from SQL aggregates
+            self.register_table_profile(table_name, df)
+            return df
+        except LoadCancelled as e:
+            app_logger.info(str(e))
+            return None
+        except Exception as e:
+            app_logger.error(f"Error sampling table {table_name}: {str(e)}")
+            return None
+    
+    def _integer_primary_key(self, table_name):
+        """Name of a single-column integer primary key, or None"""
+        info = get_catalog(self.pool).table_info(table_name)
+        if not info:
+            return None
+        keys = [column for column in info["columns"] if column[3] == "PRI"]
+        if len(keys) == 1 and INTEGER_TYPE.match(str(keys[0][1])):
+            return keys[0][0]
+        return None
+    
+    def _uniform_sample(self, connection, table_name, rows, seed, progress_callback, cancel_event):
+        table = quote_identifier(table_name)
+        info = get_catalog(self.pool).table_info(table_name)
+        estimated_rows = info["row_count"] if info else None
+        if not estimated_rows:
+            # No table statistics: a sampling rate from a guess could scan the whole table into memory
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            estimated_rows = cursor.fetchone()[0]
+            cursor.close()
+            if not estimated_rows:
+                return pd.DataFrame(), {"population_rows": 0}
+        key = self._integer_primary_key(table_name)
+        
+        if key is not None:
+            column = quote_identifier(key)
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM {table}")
+            low, high = cursor.fetchone()
+            cursor.close()
+            if low is None:
+                return pd.DataFrame(), {"population_rows": 0}
+            
+            # Random key values in [MIN, MAX]; the ones that exist are a uniform sample of
+            # rows, and the hit rate estimates how many rows the table has
+            span = int(high) - int(low) + 1
+            rng = random.Random(seed)
+            density = min(1.0, estimated_rows / span)
+            max_probes = rows * MAX_PROBES_PER_ROW
+            probed = set()
+            frames = []
+            hits = 0
+            for _ in range(MAX_PROBE_ROUNDS):
+                needed = rows - hits
+                if needed <= 0 or len(probed) >= min(span, max_probes) or density < MIN_PROBE_HIT_RATE:
+                    break
+                count = min(math.ceil(needed / density * 1.1), max_probes - len(probed))
+                ids = probe_ids(int(low), int(high), count, probed, rng)
+                probed.update(ids)
+                for start in range(0, len(ids), PROBE_BATCH):
+                    batch = ids[start:start + PROBE_BATCH]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    frame = _stream_query(connection, f"SELECT * FROM {table} WHERE {column} IN ({placeholders})",
+                                          batch, table_name, progress_callback, cancel_event, rows, loaded_before=hits)
+                    hits += len(frame)
+                    frames.append(frame)
+                density = hits / len(probed)
+            
+            if density >= MIN_PROBE_HIT_RATE:
+                df = pd.concat(frames, ignore_index=True)
+                sampling = {"population_rows": round(density * span),
+                            "population_is_estimate": len(probed) < span}
+                if len(df) > rows:
+                    df = df.sample(n=rows, random_state=seed).sort_index().reset_index(drop=True)
+                return df, sampling
+            # Keys are too sparse to probe efficiently
+            if hits:
+                estimated_rows = round(density * span)
+            app_logger.debug(f"Key hit rate {density:.3f} on {table_name}, sampling with a scan")
+        
+        # Keep each row with probability p in one scan; the LIMIT bounds memory if the estimate is far too low
+        p = min(1.0, rows * 1.05 / estimated_rows)
+        limit = rows * SCAN_LIMIT_FACTOR
+        rand = "RAND()" if seed is None else f"RAND({int(seed)})"
+        df = _stream_query(connection, f"SELECT * FROM {table} WHERE {rand} < %s LIMIT %s", [p, limit],
+                           table_name, progress_callback, cancel_event, rows)
+        if len(df) < limit:
+            sampling = {"population_rows": round(len(df) / p), "population_is_estimate": p < 1}
+        else:
+            # The scan stopped early, so len(df) / p undercounts the table
+            sampling = {"population_rows": estimated_rows, "population_is_estimate": True}
+        if len(df) > rows:
+            df = df.sample(n=rows, random_state=seed).sort_index().reset_index(drop=True)
+        return df, sampling
+    
+    def _stratified_sample(self, connection, table_name, stratify_column, rows, progress_callback, cancel_event):
+        table = quote_identifier(table_name)
+        column = quote_identifier(stratify_column)
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT {column}, COUNT(*) FROM {table} GROUP BY {column}")
+        populations = dict(cursor.fetchall())
+        cursor.close()
+        if len(populations) > MAX_STRATA:
+            raise ValueError(f"{stratify_column} has {len(populations):,} distinct values; "
+                             f"stratified sampling supports at most {MAX_STRATA}")
+        
+        allocation = stratum_allocation(populations, rows)
+        cases, params = [], []
+        for value, population in populations.items():
+            if value is None:
+                cases.append(f"WHEN {column} IS NULL THEN %s")
+            else:
+                cases.append(f"WHEN {column} = %s THEN %s")
+                params.append(value)
+            params.append(allocation[value] / population)
+        # One scan; each stratum keeps rows with its own probability
+        query = f"SELECT * FROM {table} WHERE RAND() < CASE {' '.join(cases)} ELSE 0 END"
+        df = _stream_query(connection, query, params, table_name, progress_callback, cancel_event,
+                           sum(allocation.values()))
+        return df, {"population_rows": sum(populations.values()), "column": stratify_column, "strata": populations}
+    
+    def register_table_profile(self, table_name, dataframe):
+        """Make get_profile() describe the full table, computed in the database,
+        for a frame holding only some of its rows"""
+        pool = self.pool
+        fingerprint = profile_cache.fingerprint(dataframe)
+        profile_cache.register_provider(
+            fingerprint, lambda frame: profile_table(pool, table_name, frame, fingerprint)
+        )
+    
     def execute_query(self, query):
-        """Execute a custom SQL query"""
+        """Execute a custom SQL query; unchanged SELECT results come from the query cache"""
         if not self.is_connected:
             return None, "Not connected to database"
         
         try:
-            df = pd.read_sql(query, self.connection)
+            cache_key, df = query_cache.lookup(self.pool, query)
+            if df is not None:
+                return df, "Query executed successfully (cached result)"
+            df = self.pool.run(lambda connection: pd.read_sql(query, connection))
+            query_cache.store(cache_key, df)
             return df, "Query executed successfully"
         except Exception as e:
             app_logger.error(f"Error executing query: {str(e)}")
             return None, f"Query error: {str(e)}"
     
     def close_connection(self):
-        """Close the database connection"""
-        if self.connection:
-            self.connection.close()
+        """Disconnect this session; pooled connections are shared and closed when idle"""
+        if self.pool:
+            self.pool = None
             self.is_connected = False
             app_logger.info("MySQL connection closed")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from utils.logger import app_logger
+
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+MYSQL_POOL_IDLE_SECONDS = float(os.getenv("MYSQL_POOL_IDLE_SECONDS", "300"))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "30"))
+# Connections idle for less than this are handed out without a ping
+PING_AFTER_SECONDS = 5
+
+# Errors that mean the connection itself is unusable
+CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+
+def is_connection_error(error):
+    """True if the error (or the driver error pandas wrapped it around) means the connection is gone"""
+    while error is not None:
+        if isinstance(error, CONNECTION_ERRORS):
+            return True
+        error = error.__cause__
+    return False
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout"""
+
+
+class _Entry:
+    def __init__(self, connection):
+        self.connection = connection
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """Bounded pool of connections to one MySQL database.
+
+    Connections are validated with a ping when they have been idle for a
+    while, reconnected if the ping fails, and closed after
+    MYSQL_POOL_IDLE_SECONDS without use.
+    """
+
+    def __init__(self, params, max_size=MYSQL_POOL_SIZE, idle_timeout=MYSQL_POOL_IDLE_SECONDS,
+                 checkout_timeout=MYSQL_POOL_TIMEOUT):
+        # Autocommit so pooled connections never hold a stale read snapshot
+        self.params = dict(params, autocommit=True)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._open = 0
+
+    @contextmanager
+    def connection(self):
+        """Check out a healthy connection; it is discarded if it fails during use"""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeout(f"No MySQL connection available after {self.checkout_timeout:.0f}s")
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry.connection
+        except BaseException as e:
+            # Also covers Streamlit stopping the script mid-fetch: a connection
+            # with unread rows of a streaming query cannot be reused
+            if entry is not None and (is_connection_error(e) or getattr(entry.connection, "unread_result", False)):
+                self._discard(entry)
+                entry = None
+            raise
+        finally:
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(entry)
+            self._slots.release()
+            self.reap_idle()
+
+    def run(self, operation):
+        """Run operation(connection), retrying once on a fresh connection if the old one dropped"""
+        try:
+            with self.connection() as connection:
+                return operation(connection)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            app_logger.warning(f"MySQL connection lost ({str(e)}), retrying on a new connection")
+            with self.connection() as connection:
+                return operation(connection)
+
+    def reap_idle(self):
+        """Close connections that have been idle longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._lock:
+            while self._idle and self._idle[0].last_used < cutoff:
+                expired.append(self._idle.popleft())
+        for entry in expired:
+            self._discard(entry)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._idle)
+            self._idle.clear()
+        for entry in entries:
+            self._discard(entry)
+
+    def stats(self):
+        with self._lock:
+            return {"open": self._open, "idle": len(self._idle), "max_size": self.max_size}
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                # Most recently used first: it is the most likely to still be alive
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+            if time.monotonic() - entry.last_used < PING_AFTER_SECONDS:
+                return entry
+            try:
+                entry.connection.ping(reconnect=True, attempts=2, delay=0.5)
+                return entry
+            except mysql.connector.Error as e:
+                app_logger.debug(f"Dropping dead MySQL connection: {str(e)}")
+                self._discard(entry)
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.params)
+        with self._lock:
+            self._open += 1
+        app_logger.debug(f"Opened MySQL connection to {self.params['host']}/{self.params['database']}")
+        return _Entry(connection)
+
+    def _discard(self, entry):
+        if entry is None:
+            return
+        with self._lock:
+            self._open -= 1
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host, username, password, database, port=3306):
+    """Process-wide pool for these connection parameters, shared by all sessions"""
+    password_hash = hashlib.sha256((password or "").encode()).hexdigest()
+    key = (host, int(port), username, database, password_hash)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool({
+                "host": host,
+                "user": username,
+                "password": password,
+                "database": database,
+                "port": port
+            })
+            _pools[key] = pool
+        return pool
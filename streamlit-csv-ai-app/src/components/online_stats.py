@@ -0,0 +1,171 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+from components.data_profile import (
+    CATEGORICAL_DTYPES, QUANTILES, ColumnProfile, DatasetProfile
+)
+
+# Sketch sizes: KMV distinct-count error is roughly 1/sqrt(k)
+DISTINCT_SKETCH_SIZE = 1024
+TOP_K = 10
+TOP_K_CAPACITY = 200
+QUANTILE_SAMPLE_SIZE = 10000
+
+_HASH_SPACE = float(2 ** 64)
+
+
+class RunningColumnStats:
+    """Mergeable running statistics for one column, updated chunk by chunk"""
+
+    def __init__(self, name, seed=0):
+        self.name = name
+        self.rows = 0
+        self.null_count = 0
+        self.sample_values = []
+
+        # Welford / Chan running moments for numeric chunks
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+        self._distinct_hashes = np.empty(0, dtype=np.uint64)
+        self._top_counts = {}
+        self._rng = np.random.default_rng(seed)
+        self._sample_keys = np.empty(0)
+        self._sample = np.empty(0)
+
+    def update(self, series):
+        """Fold one chunk of the column into the running statistics"""
+        self.rows += len(series)
+        non_null = series.dropna()
+        self.null_count += len(series) - len(non_null)
+        if len(non_null) == 0:
+            return
+
+        if len(self.sample_values) < 3:
+            self.sample_values += non_null.head(3 - len(self.sample_values)).tolist()
+
+        self._update_distinct(non_null)
+        if pd.api.types.is_numeric_dtype(non_null) and not pd.api.types.is_bool_dtype(non_null):
+            self._update_moments(non_null)
+            self._update_quantile_sample(non_null)
+        else:
+            self._update_top_values(non_null)
+
+    def _update_moments(self, values):
+        n_b = len(values)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+
+        self.sum += values.sum()
+        chunk_min, chunk_max = values.min(), values.max()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    def _update_distinct(self, values):
+        # K-minimum-values sketch over 64-bit value hashes
+        hashes = pd.util.hash_array(values.to_numpy())
+        merged = np.union1d(self._distinct_hashes, hashes)
+        self._distinct_hashes = merged[:DISTINCT_SKETCH_SIZE]
+
+    def _update_top_values(self, values):
+        # Space-saving style heavy hitters: merge counts, keep the largest
+        for value, count in values.value_counts().items():
+            self._top_counts[value] = self._top_counts.get(value, 0) + int(count)
+        if len(self._top_counts) > TOP_K_CAPACITY:
+            kept = sorted(self._top_counts.items(), key=lambda item: item[1], reverse=True)
+            self._top_counts = dict(kept[:TOP_K_CAPACITY])
+
+    def _update_quantile_sample(self, values):
+        # Uniform sample by random priority (bottom-k), used for quantiles
+        keys = self._rng.random(len(values))
+        all_keys = np.concatenate([self._sample_keys, keys])
+        all_values = np.concatenate([self._sample, values.to_numpy(dtype=float)])
+        if len(all_keys) > QUANTILE_SAMPLE_SIZE:
+            keep = np.argpartition(all_keys, QUANTILE_SAMPLE_SIZE)[:QUANTILE_SAMPLE_SIZE]
+            all_keys, all_values = all_keys[keep], all_values[keep]
+        self._sample_keys, self._sample = all_keys, all_values
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def distinct_count(self):
+        """Return (estimate, is_approximate)"""
+        kept = len(self._distinct_hashes)
+        if kept < DISTINCT_SKETCH_SIZE:
+            return kept, False
+        kth = float(self._distinct_hashes[-1]) + 1.0
+        return int(round((DISTINCT_SKETCH_SIZE - 1) * _HASH_SPACE / kth)), True
+
+    @property
+    def top_values(self):
+        ranked = sorted(self._top_counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:TOP_K]
+
+    def to_column_profile(self, dtype, kind):
+        col = ColumnProfile(self.name, dtype, kind)
+        col.count = self.rows - self.null_count
+        col.null_count = self.null_count
+        col.sample_values = self.sample_values
+        col.unique_count, col.unique_is_approximate = self.distinct_count
+        col.top_values = self.top_values
+        if kind == "numeric" and self.count > 0:
+            col.sum = self.sum
+            col.mean = self.mean
+            col.std = float(np.sqrt(self.variance))
+            col.min = self.min
+            col.max = self.max
+            col.quantiles = dict(zip(QUANTILES, np.quantile(self._sample, QUANTILES).tolist()))
+        return col
+
+
+class StreamingProfiler:
+    """Builds a DatasetProfile incrementally while a CSV is read in chunks"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+        self._digest = hashlib.blake2b(digest_size=16)
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for i, col in enumerate(chunk.columns):
+            if col not in self.columns:
+                self.columns[col] = RunningColumnStats(col, seed=i)
+            self.columns[col].update(chunk[col])
+        self._digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+
+    @property
+    def fingerprint(self):
+        """Fingerprint of the streamed rows (stable for identical uploads)"""
+        return self._digest.hexdigest()
+
+    def to_profile(self, dataframe):
+        """Finish the profile using the assembled frame only for dtypes and head rows"""
+        numeric_cols = set(dataframe.select_dtypes(include=['number']).columns)
+        categorical_cols = set(dataframe.select_dtypes(include=CATEGORICAL_DTYPES).columns)
+
+        columns = []
+        for col in dataframe.columns:
+            if col in numeric_cols:
+                kind = "numeric"
+            elif col in categorical_cols:
+                kind = "categorical"
+            else:
+                kind = "other"
+            columns.append(self.columns[col].to_column_profile(str(dataframe[col].dtype), kind))
+
+        profile = DatasetProfile(self.fingerprint, self.rows, columns, dataframe.head(3))
+        profile.approximate = True
+        return profile
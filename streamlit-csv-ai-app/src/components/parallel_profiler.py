@@ -0,0 +1,204 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils.logger import app_logger
+from components.data_profile import CATEGORICAL_DTYPES, QUANTILES, ColumnProfile, DatasetProfile, _profile_series
+
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", str(os.cpu_count() or 4)))
+# Batches per worker: more, smaller batches even out columns of different cost
+BATCHES_PER_WORKER = 4
+TOP_VALUES = 10
+
+
+def _sample_values(series, mask):
+    """First three non-null values without copying the whole column"""
+    head = series.head(1000)
+    values = head[mask[:len(head)]].head(3).tolist()
+    if len(values) < 3 and len(series) > len(head):
+        values = series[mask].head(3).tolist()
+    return values
+
+
+def _profile_numeric(col, series, mask):
+    """Statistics of a numeric column from one sort of its non-null values"""
+    # The column's own NumPy dtype (also for nullable Int64/Float32): uint64 must not wrap
+    # through int64, and float32 statistics stay float32 as they do in pandas
+    dtype = getattr(series.dtype, "numpy_dtype", series.dtype)
+    values = series.to_numpy(dtype=dtype, na_value=0)[mask] if not mask.all() else series.to_numpy(dtype=dtype)
+    col.count = len(values)
+    col.sum = values.sum()
+    if col.count == 0:
+        col.unique_count = 0
+        return
+    ordered = np.sort(values, kind="quicksort")
+    col.unique_count = int(np.count_nonzero(ordered[1:] != ordered[:-1])) + 1
+    col.mean = values.mean()
+    col.std = values.std(ddof=1) if col.count > 1 else np.nan
+    col.min = ordered[0]
+    col.max = ordered[-1]
+    col.quantiles = dict(zip(QUANTILES, np.quantile(ordered, QUANTILES).tolist()))
+
+
+def _profile_categorical(col, series):
+    """Distinct count and most common values; categoricals are counted from their integer codes"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        col.unique_count = int(np.count_nonzero(counts))
+        top = np.argsort(-counts, kind="stable")[:TOP_VALUES]
+        categories = series.cat.categories
+        col.top_values = [(categories[i], int(counts[i])) for i in top if counts[i] > 0]
+    else:
+        counts = series.value_counts()
+        col.unique_count = len(counts)
+        col.top_values = list(counts.head(TOP_VALUES).items())
+
+
+def profile_column(name, series, kind):
+    """Same statistics as data_profile._profile_series, computed with NumPy kernels"""
+    col = ColumnProfile(name, str(series.dtype), kind)
+    mask = series.notna().to_numpy()
+    col.count = int(mask.sum())
+    col.null_count = len(series) - col.count
+    col.sample_values = _sample_values(series, mask)
+    if kind == "numeric":
+        _profile_numeric(col, series, mask)
+    else:
+        _profile_categorical(col, series)
+    return col
+
+
+def _column_kinds(dataframe):
+    numeric_cols = set(dataframe.select_dtypes(include=['number']).columns)
+    categorical_cols = set(dataframe.select_dtypes(include=CATEGORICAL_DTYPES).columns)
+    kinds = []
+    for col in dataframe.columns:
+        if col in numeric_cols:
+            kinds.append("numeric")
+        elif col in categorical_cols:
+            kinds.append("categorical")
+        else:
+            kinds.append("other")
+    return kinds
+
+
+class ParallelProfiler:
+    """Profiles the columns of wide DataFrames on a thread pool.
+
+    Columns are split into interleaved batches that are profiled
+    concurrently. The kernels are NumPy sorts, reductions and bincounts,
+    and pyarrow value counts for Arrow strings, which all release the GIL,
+    so threads share the frame without copying it to other processes.
+    """
+
+    def __init__(self, workers=PROFILE_WORKERS):
+        self.workers = max(1, workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def profile(self, dataframe, fingerprint=None):
+        """Build a DatasetProfile equivalent to DatasetProfile.from_dataframe"""
+        started = time.perf_counter()
+        kinds = _column_kinds(dataframe)
+        positions = range(len(dataframe.columns))
+
+        def run(batch):
+            return [(i, profile_column(dataframe.columns[i], dataframe.iloc[:, i], kinds[i])) for i in batch]
+
+        batch_count = min(len(dataframe.columns), self.workers * BATCHES_PER_WORKER)
+        if self.workers == 1 or batch_count <= 1:
+            results = [run(positions)]
+        else:
+            batches = [positions[start::batch_count] for start in range(batch_count)]
+            results = list(self._pool().map(run, batches))
+
+        columns = [None] * len(dataframe.columns)
+        for batch in results:
+            for i, col in batch:
+                columns[i] = col
+        app_logger.debug(
+            f"Profiled {len(columns)} columns on {self.workers} threads in {time.perf_counter() - started:.2f}s"
+        )
+        return DatasetProfile(fingerprint, len(dataframe), columns, dataframe.head(3))
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="profiler")
+            return self._executor
+
+
+def _synthetic_frame(rows, columns, seed=0):
+    """Wide benchmark frame: three numeric columns for every categorical one"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 4 == 3:
+            data[f"cat_{i}"] = pd.Categorical.from_codes(rng.integers(0, 50, rows), [f"v{k}" for k in range(50)])
+        elif i % 4 == 2:
+            data[f"int_{i}"] = rng.integers(0, 1_000_000, rows, dtype=np.int64)
+        else:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.01] = np.nan
+            data[f"num_{i}"] = values
+    return pd.DataFrame(data)
+
+
+def benchmark(rows=200_000, columns=320, worker_counts=None, dataframe=None):
+    """
+    Time column profiling serially with pandas and in parallel with 1..N threads
+
+    Returns:
+        list of dict: {"method", "workers", "seconds", "speedup"}, speedup
+        relative to the serial pandas profile
+    """
+    if dataframe is None:
+        dataframe = _synthetic_frame(rows, columns)
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({n for n in (1, 2, 4, 8, 16, 32) if n <= cpus} | {cpus})
+
+    kinds = _column_kinds(dataframe)
+    started = time.perf_counter()
+    for i, kind in enumerate(kinds):
+        _profile_series(dataframe.columns[i], dataframe.iloc[:, i], kind)
+    baseline = time.perf_counter() - started
+    results = [{"method": "pandas (serial)", "workers": 1, "seconds": baseline, "speedup": 1.0}]
+
+    for workers in worker_counts:
+        profiler = ParallelProfiler(workers)
+        profiler.profile(dataframe.head(1000))  # start the threads outside the timing
+        started = time.perf_counter()
+        profiler.profile(dataframe)
+        seconds = time.perf_counter() - started
+        profiler.close()
+        results.append({"method": "parallel", "workers": workers, "seconds": seconds, "speedup": baseline / seconds})
+    return results
+
+
+# Global profiler shared by all sessions
+parallel_profiler = ParallelProfiler()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel column profiling")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=320)
+    parser.add_argument("--workers", type=int, nargs="*", help="thread counts to try (default: 1, 2, 4, ... up to the CPU count)")
+    args = parser.parse_args()
+
+    print(f"Profiling {args.rows:,} rows x {args.columns} columns on {os.cpu_count()} CPUs")
+    print(f"{'method':<18}{'workers':>8}{'seconds':>10}{'speedup':>9}")
+    for result in benchmark(args.rows, args.columns, args.workers):
+        print(f"{result['method']:<18}{result['workers']:>8}{result['seconds']:>10.2f}{result['speedup']:>8.1f}x")
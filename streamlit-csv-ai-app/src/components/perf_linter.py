@@ -0,0 +1,436 @@
+import ast
+import copy
+import os
+
+# Estimated seconds per row for each pattern left in the code
+ITERROWS = "iterrows"
+ITERTUPLES = "itertuples"
+ROW_APPLY = "row_apply"
+ELEMENT_APPLY = "element_apply"
+PYTHON_LOOP = "python_loop"
+BUILTIN_AGGREGATE = "builtin_aggregate"
+REPEATED_GROUPBY = "repeated_groupby"
+
+SECONDS_PER_ROW = {
+    ITERROWS: 2e-5,
+    ITERTUPLES: 2e-6,
+    ROW_APPLY: 1e-5,
+    ELEMENT_APPLY: 5e-7,
+    PYTHON_LOOP: 2e-7,
+    BUILTIN_AGGREGATE: 1e-7,
+    REPEATED_GROUPBY: 5e-8,
+}
+# Vectorized pandas work, per row, for code without findings
+BASE_SECONDS_PER_ROW = 2e-8
+
+# Above this estimate code runs on a sample; if even MIN_SAMPLE_ROWS would be too slow it is refused
+PERF_TIME_BUDGET_SECONDS = float(os.getenv("PERF_TIME_BUDGET_SECONDS", "5"))
+MIN_SAMPLE_ROWS = 1000
+
+RUN = "run"
+SAMPLE = "sample"
+REFUSE = "refuse"
+
+BUILTIN_AGGREGATES = {"sum": "sum", "max": "max", "min": "min"}
+# Iterating these is over columns, groups or a handful of values, not over rows
+SMALL_RESULT_ATTRIBUTES = {"columns", "dtypes", "keys", "items", "unique", "value_counts", "groupby",
+                           "head", "tail", "nlargest", "nsmallest", "describe", "sample"}
+# Results of these have one entry per row of the frame they are called on
+ROW_PRESERVING_METHODS = {"assign", "merge", "join", "copy", "query", "dropna", "fillna", "drop", "drop_duplicates",
+                          "rename", "astype", "replace", "where", "mask", "sort_values", "sort_index", "reset_index",
+                          "set_index", "apply", "map", "isin", "between", "abs", "round", "clip", "to_numpy"}
+# Methods that modify the frame they are called on
+MUTATING_METHODS = {"insert", "pop", "update"}
+ROW_PRESERVING_ATTRIBUTES = {"loc", "iloc", "values", "str", "dt"}
+_VECTOR_NODES = (ast.BinOp, ast.UnaryOp, ast.Constant, ast.operator, ast.unaryop, ast.cmpop, ast.Load)
+
+
+class Finding:
+    """A slow pattern found in generated code"""
+
+    def __init__(self, kind, line, message, rewritten=False, nested=False):
+        self.kind = kind
+        self.line = line
+        self.message = message
+        self.rewritten = rewritten
+        self.nested = nested  # inside another per-row loop: cost grows with rows squared
+
+    def __str__(self):
+        status = "rewritten" if self.rewritten else "kept"
+        return f"line {self.line}: {self.message} ({status})"
+
+
+class ExecutionPlan:
+    """How to run code on a dataset of a given size"""
+
+    def __init__(self, action, rows, estimated_seconds, reason=None):
+        self.action = action
+        self.rows = rows
+        self.estimated_seconds = estimated_seconds
+        self.reason = reason
+
+
+def _root_name(node):
+    """Name at the root of data['x'].values, data.groupby(...), ..."""
+    while True:
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, (ast.Attribute, ast.Subscript)):
+            node = node.value
+        elif isinstance(node, ast.Call):
+            node = node.func
+        else:
+            return None
+
+
+def _chain_attributes(node):
+    attributes = set()
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Call)):
+        if isinstance(node, ast.Attribute):
+            attributes.add(node.attr)
+        node = node.func if isinstance(node, ast.Call) else node.value
+    return attributes
+
+
+def _is_column(node, frames):
+    """data['x'] with a constant column name"""
+    return (
+        isinstance(node, ast.Subscript)
+        and _root_name(node.value) in frames
+        and isinstance(node.slice, ast.Constant)
+        and isinstance(node.slice.value, str)
+    )
+
+
+def _method_call(node, *names):
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in names
+
+
+def _is_row_apply(call):
+    for keyword in call.keywords:
+        if keyword.arg == "axis" and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value in (1, "columns")
+    return False
+
+
+class _FrameTracker(ast.NodeVisitor):
+    """Names holding the dataset or frames derived from it"""
+
+    def __init__(self):
+        self.frames = {"data"}
+        self.stored_frames = set()
+
+    def visit_Assign(self, node):
+        if self._keeps_rows(node.value):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.frames.add(target.id)
+        self._track_stores(node.targets)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        self._track_stores([node.target])
+        self.generic_visit(node)
+
+    def visit_Delete(self, node):
+        self._track_stores(node.targets)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        # data.dropna(inplace=True), data.insert(...), data['x'].update(...) modify the frame
+        if isinstance(node.func, ast.Attribute):
+            inplace = any(
+                keyword.arg == "inplace" and not (isinstance(keyword.value, ast.Constant) and not keyword.value.value)
+                for keyword in node.keywords
+            )
+            if inplace or node.func.attr in MUTATING_METHODS:
+                self._track_stores([node.func.value])
+        self.generic_visit(node)
+
+    def _keeps_rows(self, node):
+        """Filters, column selections, assign/merge and arithmetic on a frame; not reductions or plots"""
+        if isinstance(node, ast.Name):
+            return node.id in self.frames
+        if isinstance(node, ast.Subscript):
+            return self._keeps_rows(node.value)
+        if isinstance(node, ast.Attribute):
+            return node.attr in ROW_PRESERVING_ATTRIBUTES and self._keeps_rows(node.value)
+        if isinstance(node, ast.BinOp):
+            return self._keeps_rows(node.left) or self._keeps_rows(node.right)
+        if isinstance(node, ast.UnaryOp):
+            return self._keeps_rows(node.operand)
+        if isinstance(node, ast.Compare):
+            return self._keeps_rows(node.left)
+        if _method_call(node, *ROW_PRESERVING_METHODS) and self._keeps_rows(node.func.value):
+            return True
+        if _method_call(node, "merge", "concat"):
+            # pd.merge(data, other), pd.concat([data, other])
+            arguments = [element for argument in node.args
+                         for element in (argument.elts if isinstance(argument, (ast.List, ast.Tuple)) else [argument])]
+            return any(self._keeps_rows(argument) for argument in arguments)
+        return False
+
+    def _track_stores(self, targets):
+        for target in targets:
+            root = _root_name(target)
+            if root is not None:
+                self.stored_frames.add(root)
+
+
+class _Rewriter(ast.NodeTransformer):
+    def __init__(self, frames):
+        self.frames = frames
+        self.findings = []
+        self._row_loop_depth = 0
+
+    def _add(self, kind, node, message, rewritten=False):
+        self.findings.append(Finding(kind, getattr(node, "lineno", 0), message, rewritten, self._row_loop_depth > 0))
+
+    # -- loops -------------------------------------------------------------
+
+    def _row_iteration(self, iterable):
+        if _chain_attributes(iterable) & SMALL_RESULT_ATTRIBUTES:
+            return None
+        if _method_call(iterable, "iterrows") and _root_name(iterable.func.value) in self.frames:
+            return ITERROWS
+        if _method_call(iterable, "itertuples") and _root_name(iterable.func.value) in self.frames:
+            return ITERTUPLES
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name):
+            if iterable.func.id in ("range", "zip", "enumerate"):
+                if any(self._mentions_frame(arg) for arg in iterable.args):
+                    return PYTHON_LOOP
+        if _root_name(iterable) in self.frames:
+            return PYTHON_LOOP
+        return None
+
+    def _mentions_frame(self, node):
+        return any(isinstance(child, ast.Name) and child.id in self.frames for child in ast.walk(node))
+
+    def visit_For(self, node):
+        kind = self._row_iteration(node.iter)
+        if kind is None:
+            return self.generic_visit(node)
+
+        replacement = self._rewrite_accumulation(node, kind)
+        if replacement is not None:
+            self._add(kind, node, "loop summing a column replaced by .sum()", rewritten=True)
+            return ast.copy_location(replacement, node)
+
+        self._add(kind, node, {
+            ITERROWS: "row-by-row loop with iterrows()",
+            ITERTUPLES: "row-by-row loop with itertuples()",
+            PYTHON_LOOP: "Python loop over the rows of a column",
+        }[kind])
+        self._row_loop_depth += 1
+        try:
+            return self.generic_visit(node)
+        finally:
+            self._row_loop_depth -= 1
+
+    def _rewrite_accumulation(self, node, kind):
+        """`for v in data['x']: total += v` -> `total += data['x'].sum(skipna=False)` (also via iterrows)"""
+        if node.orelse or len(node.body) != 1:
+            return None
+        statement = node.body[0]
+        if not (isinstance(statement, ast.AugAssign) and isinstance(statement.op, ast.Add)
+                and isinstance(statement.target, ast.Name)):
+            return None
+
+        column = None
+        if kind == PYTHON_LOOP and isinstance(node.target, ast.Name):
+            iterable = node.iter
+            if isinstance(iterable, ast.Attribute) and iterable.attr == "values":
+                iterable = iterable.value
+            if _is_column(iterable, self.frames) and isinstance(statement.value, ast.Name) \
+                    and statement.value.id == node.target.id:
+                column = iterable
+        elif kind == ITERROWS and isinstance(node.target, ast.Tuple) and len(node.target.elts) == 2:
+            row = node.target.elts[1]
+            value = statement.value
+            if isinstance(row, ast.Name) and isinstance(value, ast.Subscript) \
+                    and isinstance(value.value, ast.Name) and value.value.id == row.id \
+                    and isinstance(value.slice, ast.Constant) and isinstance(value.slice.value, str):
+                column = ast.Subscript(value=copy.deepcopy(node.iter.func.value), slice=value.slice, ctx=ast.Load())
+        if column is None:
+            return None
+
+        # skipna=False: like the loop, a missing value makes the total NaN
+        total = ast.Call(func=ast.Attribute(value=column, attr="sum", ctx=ast.Load()), args=[],
+                         keywords=[ast.keyword(arg="skipna", value=ast.Constant(value=False))])
+        return ast.AugAssign(target=statement.target, op=ast.Add(), value=total)
+
+    def visit_comprehension(self, node):
+        kind = self._row_iteration(node.iter)
+        if kind is not None:
+            self._add(kind, node.iter, "comprehension iterating over rows")
+        return self.generic_visit(node)
+
+    # -- calls -------------------------------------------------------------
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+
+        if _method_call(node, "apply") and _root_name(node.func.value) in self.frames:
+            receiver = node.func.value
+            function = node.args[0] if node.args else None
+            if _is_row_apply(node):
+                vectorized = self._vectorize_lambda(function, receiver, row_wise=True)
+                if vectorized is not None:
+                    self._add(ROW_APPLY, node, "apply(axis=1) replaced by column arithmetic", rewritten=True)
+                    return ast.copy_location(vectorized, node)
+                self._add(ROW_APPLY, node, "row-wise apply(axis=1)")
+            elif _is_column(receiver, self.frames):
+                vectorized = self._vectorize_lambda(function, receiver, row_wise=False)
+                if vectorized is not None:
+                    self._add(ELEMENT_APPLY, node, "element-wise apply replaced by Series arithmetic", rewritten=True)
+                    return ast.copy_location(vectorized, node)
+                self._add(ELEMENT_APPLY, node, "element-wise apply on a column")
+
+        if isinstance(node.func, ast.Name) and node.func.id in BUILTIN_AGGREGATES \
+                and len(node.args) == 1 and not node.keywords:
+            argument = node.args[0]
+            if _is_column(argument, self.frames):
+                self._add(BUILTIN_AGGREGATE, node, f"builtin {node.func.id}() replaced by .{node.func.id}()", rewritten=True)
+                method = ast.Attribute(value=argument, attr=BUILTIN_AGGREGATES[node.func.id], ctx=ast.Load())
+                keywords = [ast.keyword(arg="skipna", value=ast.Constant(value=False))] if node.func.id == "sum" else []
+                return ast.copy_location(ast.Call(func=method, args=[], keywords=keywords), node)
+        return node
+
+    def _vectorize_lambda(self, function, receiver, row_wise):
+        """Arithmetic/comparison lambdas become the same expression on whole columns"""
+        if not (isinstance(function, ast.Lambda) and len(function.args.args) == 1):
+            return None
+        parameter = function.args.args[0].arg
+        body = function.body
+        if not any(isinstance(child, ast.Name) and child.id == parameter for child in ast.walk(body)):
+            return None
+
+        for child in ast.walk(body):
+            if isinstance(child, ast.Compare) and len(child.ops) != 1:
+                return None  # chained comparisons do not work on Series
+            if isinstance(child, (ast.Compare, *_VECTOR_NODES)):
+                continue
+            if isinstance(child, ast.Name) and child.id == parameter:
+                continue
+            if row_wise and isinstance(child, ast.Subscript) and isinstance(child.value, ast.Name) \
+                    and child.value.id == parameter and isinstance(child.slice, ast.Constant):
+                continue
+            return None
+
+        class _Substitute(ast.NodeTransformer):
+            def visit_Subscript(self, node):
+                if isinstance(node.value, ast.Name) and node.value.id == parameter:
+                    return ast.Subscript(value=copy.deepcopy(receiver), slice=node.slice, ctx=ast.Load())
+                return self.generic_visit(node)
+
+            def visit_Name(self, node):
+                if node.id == parameter:
+                    if row_wise:
+                        raise ValueError("row used as a whole")
+                    return copy.deepcopy(receiver)
+                return node
+
+        try:
+            return _Substitute().visit(copy.deepcopy(body))
+        except ValueError:
+            return None
+
+
+def _hoist_groupby(tree, tracker, findings):
+    """Compute the same data.groupby(<constant keys>) once when it appears several times"""
+    occurrences = {}
+    for node in ast.walk(tree):
+        if _method_call(node, "groupby") and isinstance(node.func.value, ast.Name) \
+                and node.func.value.id in tracker.frames:
+            occurrences.setdefault(ast.dump(node), []).append(node)
+
+    for number, nodes in enumerate((nodes for nodes in occurrences.values() if len(nodes) > 1), start=1):
+        first = nodes[0]
+        frame = first.func.value.id
+        constant_keys = all(
+            isinstance(child, (ast.Constant, ast.List, ast.Tuple, ast.Load, ast.keyword))
+            for argument in first.args + [k.value for k in first.keywords]
+            for child in ast.walk(argument)
+        )
+        # Safe only if the frame is never modified and the keys cannot change
+        if frame in tracker.stored_frames or not constant_keys:
+            findings.append(Finding(REPEATED_GROUPBY, first.lineno, f"groupby on '{frame}' repeated {len(nodes)} times"))
+            continue
+
+        name = f"_grouped_{number}"
+        position = next(
+            index for index, statement in enumerate(tree.body)
+            if any(child is first for child in ast.walk(statement))
+        )
+        tree.body.insert(position, ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=copy.deepcopy(first)))
+        ids = {id(node) for node in nodes}
+
+        class _Replace(ast.NodeTransformer):
+            def visit_Call(self, node):
+                if id(node) in ids:
+                    return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+                return self.generic_visit(node)
+
+        for statement in tree.body[position + 1:]:
+            _Replace().visit(statement)
+        findings.append(Finding(REPEATED_GROUPBY, first.lineno,
+                                f"groupby on '{frame}' repeated {len(nodes)} times, now computed once", rewritten=True))
+
+
+def lint(tree):
+    """
+    Find and rewrite slow pandas patterns in a module AST
+
+    Rewrites: arithmetic lambdas in apply(), loops that only sum a column,
+    builtin sum/min/max over a column and repeated groupby calls.
+    Other row-wise patterns are reported but kept.
+
+    Returns:
+        tuple: (rewritten tree, list of Finding)
+    """
+    tracker = _FrameTracker()
+    tracker.visit(tree)
+    rewriter = _Rewriter(tracker.frames)
+    tree = rewriter.visit(tree)
+    findings = rewriter.findings
+    _hoist_groupby(tree, tracker, findings)
+    return ast.fix_missing_locations(tree), findings
+
+
+def estimate_seconds(findings, rows):
+    """Rough run time of code with these findings on a dataset with this many rows"""
+    seconds = BASE_SECONDS_PER_ROW * rows
+    for finding in findings:
+        if finding.rewritten:
+            continue
+        per_row = SECONDS_PER_ROW[finding.kind]
+        seconds += per_row * rows * (rows if finding.nested else 1)
+    return seconds
+
+
+def plan_execution(findings, rows, budget=PERF_TIME_BUDGET_SECONDS):
+    """Run as is, run on a random sample, or refuse, based on the estimated time"""
+    estimate = estimate_seconds(findings, rows)
+    if estimate <= budget:
+        return ExecutionPlan(RUN, rows, estimate)
+
+    # Largest sample whose estimate fits the budget
+    low, high = 0, rows
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_seconds(findings, middle) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+
+    if low < MIN_SAMPLE_ROWS:
+        return ExecutionPlan(
+            REFUSE, rows, estimate,
+            f"This analysis would take about {estimate:,.0f}s on {rows:,} rows because of row-by-row Python code. "
+            f"Try asking for a simpler aggregation or chart."
+        )
+    return ExecutionPlan(
+        SAMPLE, low, estimate,
+        f"Estimated {estimate:,.0f}s on all {rows:,} rows, so this ran on a random sample of {low:,} rows. "
+        f"Totals and counts reflect the sample only."
+    )
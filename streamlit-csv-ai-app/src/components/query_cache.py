@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from utils.logger import app_logger
+from components.dataframe_cache import dataframe_cache
+
+# Set to 1 to add CHECKSUM TABLE to the change check (cheap only for tables with live checksums)
+QUERY_CACHE_CHECKSUM = os.getenv("QUERY_CACHE_CHECKSUM", "0") == "1"
+# Tables written this recently are not cached, so later writes always change UPDATE_TIME
+RECENT_WRITE_SECONDS = 2
+
+_TOKEN = re.compile(r"`(?:[^`]|``)*`|'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|[\w$]+|\S")
+# Results of these depend on more than the table contents
+_VOLATILE = re.compile(r"\b(NOW|CURRENT_TIMESTAMP|CURDATE|CURTIME|SYSDATE|UNIX_TIMESTAMP|RAND|UUID|CONNECTION_ID|USER)\s*\(", re.I)
+# Keywords that end a FROM clause
+_CLAUSE_END = {"WHERE", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "WINDOW", "FOR", "LOCK", "INTO"}
+
+
+def normalize_sql(sql):
+    """Collapse whitespace outside string literals and drop a trailing semicolon"""
+    return " ".join(_TOKEN.findall(sql.strip().rstrip(";")))
+
+
+def _unquote(token):
+    if token.startswith("`"):
+        return token[1:-1].replace("``", "`")
+    return token
+
+
+def referenced_tables(sql):
+    """
+    Tables named in FROM clauses: after FROM, JOIN or a comma, at any nesting level
+
+    Returns:
+        set of table names, or None if the statement is not a cacheable read
+    """
+    tokens = _TOKEN.findall(sql)
+    if not tokens or tokens[0].upper() not in ("SELECT", "WITH"):
+        return None
+
+    tables = set()
+    depth = 0
+    open_clauses = set()  # nesting depths with a FROM clause in progress
+    expect_table = False
+    for position, token in enumerate(tokens):
+        upper = token.upper()
+        if token == "(":
+            depth += 1
+            expect_table = False  # derived table; its own FROM is found inside
+        elif token == ")":
+            open_clauses.discard(depth)
+            depth -= 1
+        elif upper == "FROM":
+            open_clauses.add(depth)
+            expect_table = True
+        elif upper in ("JOIN", "STRAIGHT_JOIN") or (token == "," and depth in open_clauses):
+            expect_table = True
+        elif upper in _CLAUSE_END:
+            open_clauses.discard(depth)
+            expect_table = False
+        elif expect_table:
+            if position + 1 < len(tokens) and tokens[position + 1] == ".":
+                # database.table - only the current database is tracked
+                return None
+            tables.add(_unquote(token))
+            expect_table = False
+    return tables or None
+
+
+class QueryResultCache:
+    """Caches SELECT results by connection, normalized SQL and table versions.
+
+    A table's version is its CREATE_TIME/UPDATE_TIME from information_schema
+    (optionally plus CHECKSUM TABLE), read fresh on each lookup with one
+    small query. Any change to a referenced table therefore produces a new
+    cache key, and stale results simply age out. Queries on views, on tables
+    without an UPDATE_TIME (unless checksums are on) or on tables written in
+    the last RECENT_WRITE_SECONDS are not cached. Frames are kept in the
+    shared DataFrameCache, which keeps them in memory up to its budget and
+    spills the rest to Parquet.
+    """
+
+    def __init__(self, frames=dataframe_cache):
+        self.frames = frames
+
+    def lookup(self, pool, sql):
+        """
+        Find a cached result for a query
+
+        Returns:
+            tuple: (key, DataFrame or None). key is None when the query
+            cannot be cached (not a plain SELECT, volatile functions,
+            unknown tables).
+        """
+        tables = referenced_tables(sql)
+        if tables is None or _VOLATILE.search(sql):
+            return None, None
+        try:
+            versions = pool.run(lambda connection: self._table_versions(connection, tables))
+        except Exception as e:
+            app_logger.warning(f"Query cache: could not read table versions: {str(e)}")
+            return None, None
+        if versions is None:
+            return None, None
+
+        params = pool.params
+        identity = (params["host"], params["port"], params["user"], params["database"])
+        digest = hashlib.sha256(repr((identity, normalize_sql(sql), versions)).encode()).hexdigest()
+        key = f"sql-{digest[:40]}"
+        return key, self.frames.get(key)
+
+    def store(self, key, dataframe):
+        if key is not None:
+            self.frames.put(key, dataframe)
+
+    def _table_versions(self, connection, tables):
+        cursor = connection.cursor()
+        try:
+            # MySQL 8 caches information_schema statistics for a day by default
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        except Exception:
+            pass
+        names = sorted(tables)
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(
+            "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME, NOW() FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' AND TABLE_NAME IN ({placeholders})",
+            names
+        )
+        rows = cursor.fetchall()
+        try:
+            # Names that are not base tables here (views, CTEs, temporary tables, ...)
+            if len(rows) != len(names):
+                return None
+            # UPDATE_TIME is NULL after a server restart or for engines that do not track it
+            if any(updated is None for _, _, updated, _ in rows) and not QUERY_CACHE_CHECKSUM:
+                return None
+            # UPDATE_TIME has one-second resolution: a write later in the same second would not change it
+            if any(updated is not None and now - updated < timedelta(seconds=RECENT_WRITE_SECONDS)
+                   for _, _, updated, now in rows):
+                return None
+            versions = sorted((name, str(created), str(updated)) for name, created, updated, _ in rows)
+            if QUERY_CACHE_CHECKSUM:
+                cursor.execute("CHECKSUM TABLE " + ", ".join("`" + name.replace("`", "``") + "`" for name in names))
+                versions.append(tuple(sorted(cursor.fetchall())))
+            return tuple(versions)
+        finally:
+            cursor.close()
+
+# Global cache shared by all sessions
+query_cache = QueryResultCache()
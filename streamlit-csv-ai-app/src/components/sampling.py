@@ -0,0 +1,238 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Sampling methods recorded in DataFrame.attrs["sampling"]
+UNIFORM = "uniform"
+STRATIFIED = "stratified"
+RESERVOIR = "reservoir"
+
+MAX_STRATA = int(os.getenv("SAMPLING_MAX_STRATA", "200"))
+# Every stratum gets at least this many rows (or all of them) so its variance is usable
+MIN_STRATUM_ROWS = 30
+# Primary keys probed per "WHERE pk IN (...)" query
+PROBE_BATCH = 10000
+Z_95 = 1.96
+
+METHOD_LABELS = {
+    UNIFORM: "uniform random sample",
+    STRATIFIED: "stratified random sample",
+    RESERVOIR: "uniform random (reservoir) sample",
+}
+
+
+def sampling_info(dataframe):
+    """The sampling description of a frame, or None if it holds every row"""
+    if dataframe is None:
+        return None
+    return dataframe.attrs.get("sampling")
+
+
+def attach_sampling(dataframe, method, population_rows, population_is_estimate=False,
+                    column=None, strata=None):
+    """
+    Record how a frame was sampled in dataframe.attrs["sampling"]
+
+    Args:
+        method: UNIFORM, STRATIFIED or RESERVOIR
+        population_rows: rows in the source table or file
+        population_is_estimate: population_rows was estimated from the sample
+        column: stratification column (STRATIFIED only)
+        strata: {value: population rows} per stratum (STRATIFIED only)
+    """
+    info = {
+        "method": method,
+        "population_rows": int(population_rows),
+        "sample_rows": len(dataframe),
+        "population_is_estimate": bool(population_is_estimate),
+    }
+    if column is not None:
+        sampled = dataframe[column].value_counts(dropna=False)
+        info["column"] = column
+        # [value, population, sampled] triples: plain lists survive Arrow/Parquet metadata
+        info["strata"] = [
+            [None if pd.isna(value) else value, int(population), int(sampled.get(value, 0))]
+            for value, population in strata.items()
+        ]
+    dataframe.attrs["sampling"] = info
+    return dataframe
+
+
+def scale_factors(info):
+    """Population rows per sampled row: one factor, or {stratum: factor} for stratified samples"""
+    if info.get("strata") is not None:
+        return {value: population / sampled for value, population, sampled in info["strata"] if sampled}
+    return info["population_rows"] / max(info["sample_rows"], 1)
+
+
+def _total_and_variance(dataframe, values, info):
+    """Horvitz-Thompson total of per-row values and its variance (without-replacement SRS per stratum)"""
+    values = np.asarray(values, dtype=float)
+    if info.get("strata") is None:
+        population, n = info["population_rows"], len(values)
+        if n == 0:
+            return 0.0, 0.0
+        variance = values.var(ddof=1) if n > 1 else 0.0
+        total = population * values.mean()
+        return total, population ** 2 * (1 - n / population) * variance / n if population > n else 0.0
+
+    keys = dataframe[info["column"]]
+    total = variance = 0.0
+    for value, population, sampled in info["strata"]:
+        if not sampled:
+            continue
+        mask = keys.isna().to_numpy() if value is None else (keys == value).to_numpy()
+        stratum = values[mask]
+        n = len(stratum)
+        if n == 0:
+            continue
+        total += population * stratum.mean()
+        if n > 1 and population > n:
+            variance += population ** 2 * (1 - n / population) * stratum.var(ddof=1) / n
+    return total, variance
+
+
+def estimate_total(dataframe, column, info=None):
+    """
+    Full-population total of a numeric column estimated from a sample
+
+    Returns:
+        tuple: (estimate, 95% margin of error)
+    """
+    info = info or sampling_info(dataframe)
+    values = dataframe[column].to_numpy(dtype=float, na_value=np.nan)
+    total, variance = _total_and_variance(dataframe, np.nan_to_num(values), info)
+    return total, Z_95 * math.sqrt(variance)
+
+
+def estimate_mean(dataframe, column, info=None):
+    """
+    Full-population mean of a numeric column (ratio of estimated total to estimated count)
+
+    Returns:
+        tuple: (estimate, 95% margin of error), or (None, None) without values
+    """
+    info = info or sampling_info(dataframe)
+    values = dataframe[column].to_numpy(dtype=float, na_value=np.nan)
+    present = np.isfinite(values).astype(float)
+    values = np.nan_to_num(values)
+    total, _ = _total_and_variance(dataframe, values, info)
+    count, _ = _total_and_variance(dataframe, present, info)
+    if not count:
+        return None, None
+    ratio = total / count
+    # Linearized variance of the ratio estimator
+    _, variance = _total_and_variance(dataframe, (values - ratio * present) / count, info)
+    return ratio, Z_95 * math.sqrt(variance)
+
+
+def describe_sample(dataframe, profile=None, max_strata=20, max_columns=10):
+    """
+    Context section telling the model the data is a sample and how to scale it
+
+    Returns:
+        str: section text, or "" if the frame is not a sample
+    """
+    info = sampling_info(dataframe)
+    if info is None:
+        return ""
+    population, n = info["population_rows"], info["sample_rows"]
+    about = "~" if info["population_is_estimate"] else ""
+    context = f"\n\nSAMPLING:\nThe loaded data (`data`) is a {METHOD_LABELS[info['method']]} of {n:,} of {about}{population:,} rows"
+    if info.get("column") is not None:
+        context += f", stratified by `{info['column']}`"
+    context += ".\n"
+    if profile is not None and profile.row_count > n:
+        context += f"The statistics above describe all {profile.row_count:,} rows, not just the sample.\n"
+
+    factors = scale_factors(info)
+    if isinstance(factors, dict):
+        context += ("Generated code runs on the sample: weight each row by its stratum's scale factor "
+                    "when computing totals or counts for the whole table. Scale factors:\n")
+        for value, factor in list(factors.items())[:max_strata]:
+            context += f"  {value}: {factor:.4g}\n"
+        if len(factors) > max_strata:
+            context += f"  ({len(factors) - max_strata} more strata)\n"
+    else:
+        context += (f"Generated code runs on the sample: multiply sums and counts computed from `data` "
+                    f"by {factors:.4g} to estimate whole-table values.\n")
+
+    if profile is None or profile.row_count <= n:
+        numeric = list(dataframe.select_dtypes(include=['number']).columns)[:max_columns]
+        if numeric:
+            context += "Estimated whole-table totals (95% margin of error):\n"
+            for column in numeric:
+                total, margin = estimate_total(dataframe, column, info)
+                context += f"  {column}: {total:,.2f} ± {margin:,.2f}\n"
+    return context
+
+
+# -- MySQL sample plans ---------------------------------------------------------
+
+
+def probe_ids(low, high, count, probed, rng):
+    """Up to count primary key values from [low, high] that have not been probed yet"""
+    span = high - low + 1
+    remaining = span - len(probed)
+    count = min(count, remaining)
+    if count <= 0:
+        return []
+    if count > remaining // 2:
+        # Dense request: enumerate what is left instead of rejection sampling
+        candidates = [key for key in range(low, high + 1) if key not in probed]
+        return rng.sample(candidates, count)
+    chosen = set()
+    while len(chosen) < count:
+        for key in rng.sample(range(low, high + 1), count - len(chosen)):
+            if key not in probed:
+                chosen.add(key)
+    return list(chosen)
+
+
+def stratum_allocation(populations, rows, min_rows=MIN_STRATUM_ROWS):
+    """Proportional allocation of rows across strata, at least min_rows (or all rows) each"""
+    total = sum(populations.values())
+    return {
+        value: min(population, max(min_rows, round(rows * population / max(total, 1))))
+        for value, population in populations.items()
+    }
+
+
+# -- Reservoir sampling for streamed files ----------------------------------------
+
+
+class ReservoirSampler:
+    """Uniform sample of fixed size from a stream of DataFrame chunks.
+
+    Every row gets a random key and the rows with the smallest keys are kept
+    (bottom-k sampling), which is equivalent to reservoir sampling but works
+    on whole chunks with vectorized operations.
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._sample = None
+        self._keys = None
+
+    def update(self, chunk):
+        self.rows_seen += len(chunk)
+        keys = self._rng.random(len(chunk))
+        if self._sample is not None:
+            chunk = pd.concat([self._sample, chunk], ignore_index=True)
+            keys = np.concatenate([self._keys, keys])
+        if len(chunk) > self.size:
+            keep = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            chunk = chunk.iloc[keep].reset_index(drop=True)
+            keys = keys[keep]
+        self._sample, self._keys = chunk, keys
+
+    def result(self):
+        """The sample in stream order"""
+        if self._sample is None:
+            return pd.DataFrame()
+        return self._sample
+
@@ -0,0 +1,347 @@
+import io
+import marshal
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+import types
+
+from utils.logger import app_logger
+from components.dataset_store import dataset_store, open_shared
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "2"))
+SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "60"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "2048"))
+
+# Tables sent back to the UI are truncated to keep results small
+MAX_RESULT_ROWS = 10000
+POLL_SECONDS = 0.1
+MAX_OPEN_DATASETS = 4
+
+
+class SandboxError(Exception):
+    """The sandboxed run was stopped or its worker died"""
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+class _CaptureStreamlit:
+    """Stand-in for the streamlit module that records output instead of rendering it"""
+
+    def __init__(self):
+        self.outputs = []
+
+    def pyplot(self, fig=None, **kwargs):
+        import matplotlib.pyplot as plt
+        fig = fig or plt.gcf()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        plt.close(fig)
+        self.outputs.append(("image", buffer.getvalue()))
+
+    def write(self, *args, **kwargs):
+        from matplotlib.figure import Figure
+        for arg in args:
+            if isinstance(arg, Figure):
+                self.pyplot(arg)
+            else:
+                self._record("write", (arg,), {})
+
+    def columns(self, spec, **kwargs):
+        count = spec if isinstance(spec, int) else len(spec)
+        return [self] * count
+
+    def tabs(self, labels):
+        return [self] * len(labels)
+
+    def expander(self, *args, **kwargs):
+        return self
+
+    def container(self, *args, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._record(name, args, kwargs)
+
+    def _record(self, name, args, kwargs):
+        args = tuple(_truncate(arg) for arg in args)
+        kwargs = {key: _truncate(value) for key, value in kwargs.items()}
+        try:
+            pickle.dumps((args, kwargs))
+        except Exception:
+            args = tuple(str(arg) for arg in args)
+            kwargs = {}
+        self.outputs.append(("call", name, args, kwargs))
+
+
+def _truncate(value):
+    import pandas as pd
+    if isinstance(value, (pd.DataFrame, pd.Series)) and len(value) > MAX_RESULT_ROWS:
+        return value.head(MAX_RESULT_ROWS)
+    return value
+
+
+def _limit_memory(memory_mb):
+    """Cap private writable memory; memory-mapped dataset pages do not count"""
+    if resource is None or not memory_mb:
+        return
+    try:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (ValueError, OSError, AttributeError):
+        pass
+
+
+def run_captured(code, dataframe):
+    """
+    Run generated code with a recording `st` in place of streamlit
+
+    The code may modify dataframe, so callers pass a frame of their own:
+    workers a copy-on-write view of the shared dataset, the in-process
+    fallback a private copy.
+
+    Returns:
+        dict: {"success", "outputs"} plus "error" when unsuccessful
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+    import seaborn as sns
+
+    stub = _CaptureStreamlit()
+    existing = set(plt.get_fignums())
+    try:
+        local_vars = {
+            'data': dataframe,
+            'df': dataframe,
+            'st': stub,
+            'pd': pd,
+            'plt': plt,
+            'sns': sns,
+            'np': np
+        }
+        exec(code, {'__builtins__': __builtins__}, local_vars)
+        return {"success": True, "outputs": stub.outputs}
+    except MemoryError:
+        return {"success": False, "outputs": stub.outputs, "error": "Analysis ran out of memory."}
+    except Exception as e:
+        return {"success": False, "outputs": stub.outputs, "error": str(e)}
+    finally:
+        # Only close figures created by this run
+        for number in set(plt.get_fignums()) - existing:
+            plt.close(number)
+
+
+def _worker_main(conn, memory_mb):
+    """Loop of a sandbox process: receive a task, run it, send back the outputs"""
+    import matplotlib
+    import pandas as pd
+    matplotlib.use("Agg")
+    # Datasets are memory-mapped read-only: with copy-on-write, columns are
+    # copied the first time code writes to them. Set once, in this process only
+    pd.set_option("mode.copy_on_write", True)
+
+    _limit_memory(memory_mb)
+    datasets = {}
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+
+        try:
+            path = task["dataset_path"]
+            if path is not None:
+                # Keep recently used datasets mapped; drop ones that were released
+                for old_path in [p for p in datasets if not os.path.exists(p)]:
+                    del datasets[old_path]
+                if path not in datasets:
+                    if len(datasets) >= MAX_OPEN_DATASETS:
+                        datasets.pop(next(iter(datasets)))
+                    datasets[path] = open_shared(path)
+                dataframe = datasets[path]
+            else:
+                dataframe = task["dataframe"]
+
+            code = task["code"]
+            if isinstance(code, bytes):
+                code = marshal.loads(code)
+            result = run_captured(code, dataframe.copy(deep=False))
+        except Exception as e:
+            result = {"success": False, "outputs": [], "error": str(e)}
+        conn.send(result)
+
+
+# ---------------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------------
+
+def _private_rss_mb(pid):
+    """Anonymous (non-file-backed) resident memory of a process, in MB; None if unknown"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class _Worker:
+    def __init__(self, context, memory_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_mb), name="sandbox-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class SandboxExecutorPool:
+    """Runs generated code in a pool of separate worker processes.
+
+    Workers map the dataset from the shared Arrow file (see DatasetStore), so
+    no copy of the frame is sent per run. Each run has a wall-clock timeout,
+    a memory limit and can be cancelled; a worker that is stopped or dies is
+    replaced. Figures come back as PNG bytes and other st.* calls as
+    recorded arguments, to be replayed into the page with replay_outputs().
+    """
+
+    def __init__(self, size=SANDBOX_WORKERS, timeout=SANDBOX_TIMEOUT_SECONDS, memory_mb=SANDBOX_MEMORY_MB):
+        self.size = size
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(size, 1))
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def run(self, code, dataframe, timeout=None, cancel_event=None, progress_callback=None):
+        """
+        Run code against a dataset in a worker process
+
+        Args:
+            code: source string or compiled code object
+            dataframe: dataset exposed to the code as 'data' / 'df'
+            timeout: seconds before the run is stopped (default: pool timeout)
+            cancel_event: threading.Event that stops the run when set
+            progress_callback: called with the elapsed seconds while waiting;
+                an exception raised from it (e.g. a Streamlit rerun) stops the run
+
+        Returns:
+            dict: {"success", "outputs"} plus "error" when unsuccessful
+        """
+        timeout = timeout or self.timeout
+        # Hold a reference to the shared frame so its file outlives the run
+        shared = dataset_store.share(dataframe)
+        path = dataset_store.path_for(shared)
+        task = {
+            "code": marshal.dumps(code) if isinstance(code, types.CodeType) else code,
+            "dataset_path": path,
+            "dataframe": None if path is not None else dataframe,
+        }
+
+        with self._slots:
+            worker = self._checkout()
+            finished = False
+            try:
+                worker.conn.send(task)
+                started = time.monotonic()
+                last_report = 0
+                while not worker.conn.poll(POLL_SECONDS):
+                    elapsed = time.monotonic() - started
+                    if not worker.alive():
+                        raise SandboxError("The analysis process crashed, most likely by running out of memory.")
+                    if elapsed > timeout:
+                        raise SandboxError(f"Analysis took longer than {timeout:.0f} seconds and was stopped.")
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise SandboxError("Analysis was cancelled.")
+                    rss = _private_rss_mb(worker.process.pid)
+                    if rss is not None and self.memory_mb and rss > self.memory_mb:
+                        raise SandboxError(f"Analysis needed more than the {self.memory_mb} MB memory limit and was stopped.")
+                    if progress_callback is not None and int(elapsed) > last_report:
+                        last_report = int(elapsed)
+                        progress_callback(elapsed)
+                result = worker.conn.recv()
+                finished = True
+                return result
+            except SandboxError as e:
+                app_logger.warning(f"Sandbox run stopped: {str(e)}", show_in_ui=False)
+                return {"success": False, "outputs": [], "error": str(e)}
+            except (EOFError, OSError):
+                return {"success": False, "outputs": [], "error": "The analysis process exited unexpectedly."}
+            finally:
+                # Anything other than a clean result (timeout, cancel, rerun) discards the worker
+                if finished:
+                    self._idle.put(worker)
+                else:
+                    worker.kill()
+                del shared
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+    def _checkout(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                app_logger.debug("Starting sandbox worker process")
+                return _Worker(self._context, self.memory_mb)
+            if worker.alive():
+                return worker
+            worker.kill()
+
+
+def replay_outputs(outputs):
+    """Render outputs recorded by a sandbox worker into the current page"""
+    import streamlit as st
+    for output in outputs:
+        if output[0] == "image":
+            st.image(output[1])
+            continue
+        _, name, args, kwargs = output
+        method = getattr(st, name, None)
+        if method is None:
+            app_logger.debug(f"Skipping unsupported st.{name} output", show_in_ui=False)
+            continue
+        method(*args, **kwargs)
+
+
+# Global pool shared by all sessions
+sandbox_pool = SandboxExecutorPool()
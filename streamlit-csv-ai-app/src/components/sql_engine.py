@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+from utils.logger import app_logger
+from components.dataset_store import dataset_store
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+SQL_ENGINE_THREADS = int(os.getenv("SQL_ENGINE_THREADS", str(os.cpu_count() or 4)))
+SQL_ENGINE_MEMORY_MB = int(os.getenv("SQL_ENGINE_MEMORY_MB", "2048"))
+SQL_ENGINE_TIMEOUT_SECONDS = float(os.getenv("SQL_ENGINE_TIMEOUT_SECONDS", "60"))
+# Rows of a result kept for display (the query itself sees every row)
+MAX_RESULT_ROWS = 10000
+# Bar charts are drawn for results with at most this many categories
+MAX_BAR_CATEGORIES = 50
+TABLE_NAME = "data"
+
+_FENCE = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+
+
+class SQLValidationError(Exception):
+    """Generated SQL is not a single read-only query"""
+
+
+class SQLTimeout(Exception):
+    """A query ran longer than the engine's timeout"""
+
+
+def clean_sql(text):
+    """Strip markdown fences and a trailing semicolon from model output"""
+    return _FENCE.sub("", text.strip()).strip().rstrip(";").strip()
+
+
+class SQLEngine:
+    """Runs generated SQL on the loaded dataset with DuckDB.
+
+    The dataset is registered as the table "data" without copying: shared
+    datasets are scanned straight from their memory-mapped Arrow file, other
+    frames through DuckDB's pandas scan. Queries run multi-threaded in a fresh
+    in-memory database with file and network access disabled, so only the
+    registered table can be read.
+    """
+
+    def __init__(self, threads=SQL_ENGINE_THREADS, memory_mb=SQL_ENGINE_MEMORY_MB,
+                 timeout=SQL_ENGINE_TIMEOUT_SECONDS):
+        self.threads = threads
+        self.memory_mb = memory_mb
+        self.timeout = timeout
+
+    @property
+    def available(self):
+        return duckdb is not None
+
+    def validate(self, query):
+        """Raise SQLValidationError unless query is exactly one SELECT statement"""
+        if not query:
+            raise SQLValidationError("No SQL query was generated")
+        try:
+            statements = duckdb.connect().extract_statements(query)
+        except duckdb.Error as e:
+            raise SQLValidationError(f"Invalid SQL: {str(e)}") from e
+        if len(statements) != 1:
+            raise SQLValidationError("Expected exactly one SQL statement")
+        if statements[0].type != duckdb.StatementType.SELECT:
+            raise SQLValidationError("Only SELECT queries can be run")
+
+    def run(self, query, dataframe, progress_callback=None, timeout=None, max_rows=MAX_RESULT_ROWS):
+        """
+        Run a query against the dataset
+
+        The query runs on a background thread while this thread polls it, so
+        an exception from progress_callback (e.g. a Streamlit rerun from a
+        Stop button) or the timeout interrupts it.
+
+        Args:
+            query: validated SELECT over the table "data"
+            dataframe: dataset to query
+            progress_callback: called with the elapsed seconds while running
+            timeout: seconds before the query is interrupted
+            max_rows: rows of the result to return
+
+        Returns:
+            tuple: (result DataFrame, truncated)
+        """
+        timeout = timeout or self.timeout
+        connection = self._connect()
+        self._register(connection, dataframe)
+        result = {}
+
+        def execute():
+            try:
+                result["frame"] = connection.sql(query).limit(max_rows + 1).df()
+            except BaseException as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=execute, name="sql-engine", daemon=True)
+        started = time.monotonic()
+        worker.start()
+        try:
+            while worker.is_alive():
+                worker.join(0.1)
+                elapsed = time.monotonic() - started
+                if elapsed > timeout and worker.is_alive():
+                    raise SQLTimeout(f"Query took longer than {timeout:.0f}s and was stopped")
+                if progress_callback and worker.is_alive():
+                    progress_callback(elapsed)
+        except BaseException:
+            connection.interrupt()
+            raise
+        finally:
+            worker.join()
+            connection.close()
+
+        if "error" in result:
+            raise result["error"]
+        frame = result["frame"]
+        app_logger.debug(f"SQL query returned {len(frame)} rows in {time.monotonic() - started:.2f}s")
+        return frame.head(max_rows), len(frame) > max_rows
+
+    def _connect(self):
+        return duckdb.connect(config={
+            "threads": self.threads,
+            "memory_limit": f"{self.memory_mb}MB",
+            "enable_external_access": False,
+            "lock_configuration": True,
+        })
+
+    def _register(self, connection, dataframe):
+        path = dataset_store.path_for(dataframe)
+        if path is not None:
+            try:
+                table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+                connection.register(TABLE_NAME, table)
+                return
+            except Exception as e:
+                app_logger.debug(f"Could not map {path} for SQL, scanning the frame: {str(e)}")
+        connection.register(TABLE_NAME, dataframe)
+
+
+def result_chart(frame):
+    """
+    A chart that suits a query result, as (draw, figsize), or None
+
+    Category/number results become bar charts, date/number results line
+    charts, and results keyed by a unique numeric first column line charts.
+    """
+    if len(frame) < 2 or len(frame.columns) < 2:
+        return None
+    numeric = [col for col in frame.columns if pd.api.types.is_numeric_dtype(frame[col])]
+    x = frame.columns[0]
+    values = [col for col in numeric if col != x][:3]
+    if not values:
+        return None
+
+    if pd.api.types.is_datetime64_any_dtype(frame[x]) or (x in numeric and frame[x].is_unique):
+        ordered = frame.sort_values(x)
+
+        def draw(fig, ax):
+            for col in values:
+                ax.plot(ordered[x], ordered[col], marker="o" if len(ordered) <= 50 else None, label=str(col))
+            ax.set_xlabel(str(x))
+            if len(values) > 1:
+                ax.legend()
+            ax.grid(alpha=0.3)
+            fig.autofmt_xdate()
+        return draw, (10, 6)
+
+    if x not in numeric and len(frame) <= MAX_BAR_CATEGORIES:
+        labels = frame[x].astype(str)
+
+        def draw(fig, ax):
+            ax.bar(labels, frame[values[0]], color="steelblue")
+            ax.set_xlabel(str(x))
+            ax.set_ylabel(str(values[0]))
+            ax.set_title(f"{values[0]} by {x}")
+            ax.tick_params(axis="x", labelrotation=45)
+        return draw, (10, 6)
+    return None
+
+
+# Global engine shared by all sessions
+sql_engine = SQLEngine()
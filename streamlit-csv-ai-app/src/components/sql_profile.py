@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from utils.logger import app_logger
+from components.data_profile import DatasetProfile
+
+# GROUP BY scans for most-common values are limited to this many text columns
+MAX_TOP_VALUE_COLUMNS = 20
+# COUNT(DISTINCT) is exact but costly; other columns use index cardinality or the loaded rows
+MAX_EXACT_DISTINCT_COLUMNS = 16
+TOP_VALUES = 10
+
+
+def quote_identifier(name):
+    """Backtick-quote a MySQL identifier"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _number(value):
+    """Decimal results of SUM/AVG as int or float"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def profile_table(pool, table_name, dataframe, fingerprint=None):
+    """
+    Profile a whole MySQL table with aggregate queries run in the database
+
+    Column kinds, dtypes, sample values and quantiles come from the rows that
+    were loaded. Row count, totals, means, standard deviations, min/max,
+    null counts, distinct counts and most common values are computed by the
+    database over the full table, so only a few rows cross the network.
+    Exact distinct counts are limited to MAX_EXACT_DISTINCT_COLUMNS columns
+    (text columns first); the others come from index statistics or the
+    loaded rows and are marked approximate.
+
+    Args:
+        pool: ConnectionPool for the database
+        table_name: table the frame was loaded from
+        dataframe: the loaded (possibly partial) rows
+        fingerprint: fingerprint of the loaded frame
+
+    Returns:
+        DatasetProfile: profile describing the full table
+    """
+    profile = DatasetProfile.from_dataframe(dataframe, fingerprint)
+    table = quote_identifier(table_name)
+
+    ranked = sorted(profile.columns, key=lambda col: col.kind != "categorical")
+    exact_distinct = {col.name for col in ranked[:MAX_EXACT_DISTINCT_COLUMNS]}
+    expressions = ["COUNT(*)"]
+    for col in profile.columns:
+        column = quote_identifier(col.name)
+        expressions.append(f"COUNT({column})")
+        if col.name in exact_distinct:
+            expressions.append(f"COUNT(DISTINCT {column})")
+        if col.kind == "numeric":
+            expressions += [f"SUM({column})", f"AVG({column})", f"STDDEV_SAMP({column})",
+                            f"MIN({column})", f"MAX({column})"]
+    aggregate_query = f"SELECT {', '.join(expressions)} FROM {table}"
+
+    top_columns = [col for col in profile.columns if col.kind == "categorical"][:MAX_TOP_VALUE_COLUMNS]
+    # Values are converted to one string type so the UNION ALL does not depend on implicit coercion
+    top_query = " UNION ALL ".join(
+        f"(SELECT {index}, CONVERT({quote_identifier(col.name)} USING utf8mb4), COUNT(*) AS n FROM {table} "
+        f"WHERE {quote_identifier(col.name)} IS NOT NULL GROUP BY {quote_identifier(col.name)} "
+        f"ORDER BY n DESC LIMIT {TOP_VALUES})"
+        for index, col in enumerate(top_columns)
+    )
+
+    def fetch(connection):
+        cursor = connection.cursor()
+        cursor.execute(aggregate_query)
+        totals = cursor.fetchone()
+        # Distinct values of the leading column of each index, as estimated by the server
+        cursor.execute(
+            "SELECT COLUMN_NAME, MAX(CARDINALITY) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND SEQ_IN_INDEX = 1 GROUP BY COLUMN_NAME",
+            [table_name]
+        )
+        cardinality = dict(cursor.fetchall())
+        top_rows = []
+        if top_query:
+            cursor.execute(top_query)
+            top_rows = cursor.fetchall()
+        cursor.close()
+        return totals, cardinality, top_rows
+
+    totals, cardinality, top_rows = pool.run(fetch)
+
+    values = iter(totals)
+    profile.row_count = next(values)
+    for col in profile.columns:
+        col.count = next(values)
+        col.null_count = profile.row_count - col.count
+        if col.name in exact_distinct:
+            col.unique_count = next(values)
+            col.unique_is_approximate = False
+        elif cardinality.get(col.name) is not None:
+            col.unique_count = min(int(cardinality[col.name]), col.count)
+            col.unique_is_approximate = True
+        else:
+            # Distinct values among the loaded rows: exact only if every row was loaded
+            col.unique_is_approximate = profile.row_count > len(dataframe)
+        if col.kind == "numeric":
+            col.sum = _number(next(values)) or 0
+            col.mean = _number(next(values))
+            col.std = _number(next(values))
+            col.min = _number(next(values))
+            col.max = _number(next(values))
+
+    top_values = {index: [] for index in range(len(top_columns))}
+    for index, value, count in top_rows:
+        top_values[index].append((value, count))
+    for index, col in enumerate(top_columns):
+        col.top_values = top_values[index]
+    for col in profile.columns:
+        if col.kind != "numeric" and col not in top_columns:
+            # Counts from the loaded rows would not describe the table
+            col.top_values = []
+
+    if profile.row_count > len(dataframe):
+        profile.approximate = True
+        profile.approximation_note = (
+            f"quantiles are estimated from the {len(dataframe):,} loaded rows; "
+            f"totals, counts, min/max and distinct counts cover the whole table "
+            f"(distinct counts marked ~ are estimates)"
+        )
+    app_logger.debug(f"Profiled table {table_name} in the database: {profile.row_count:,} rows")
+    return profile
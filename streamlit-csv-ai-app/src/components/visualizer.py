@@ -1,69 +1,210 @@
+import os
+import threading
+from collections import OrderedDict
+
 import streamlit as st
-import matplotlib.pyplot as plt
 import seaborn as sns
+import numpy as np
 import pandas as pd
+from matplotlib.colors import LogNorm
+from components.chart_renderer import chart_renderer, output_key
+from components.data_profile import profile_cache
+
+# Above this many rows charts are drawn from NumPy aggregates instead of raw points
+LARGE_DATA_ROWS = int(os.getenv("VISUALIZER_LARGE_ROWS", "200000"))
+HISTOGRAM_BINS = 30
+DENSITY_GRID_BINS = 200
+
+_aggregates = OrderedDict()
+_aggregates_lock = threading.Lock()
+
+
+def cached_aggregate(key, compute, max_entries=64):
+    """Memoize small aggregates (bins, grids, correlation matrices) by dataset fingerprint"""
+    with _aggregates_lock:
+        if key in _aggregates:
+            _aggregates.move_to_end(key)
+            return _aggregates[key]
+    value = compute()
+    with _aggregates_lock:
+        _aggregates[key] = value
+        while len(_aggregates) > max_entries:
+            _aggregates.popitem(last=False)
+    return value
+
+
+def _finite_values(series):
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+def _draw_no_values(ax):
+    ax.text(0.5, 0.5, 'No values to plot', ha='center', va='center', transform=ax.transAxes)
+
 
 class Visualizer:
-    def __init__(self):
-        pass
+    """Basic charts, drawn off-thread by the shared ChartRenderer and cached as PNG.
+
+    For datasets above LARGE_DATA_ROWS, data is first reduced with vectorized
+    NumPy binning (histogram counts, 2D density grids, box-plot statistics)
+    and only the aggregates are drawn.
+    """
+
+    def __init__(self, renderer=chart_renderer, large_data_rows=LARGE_DATA_ROWS):
+        self.renderer = renderer
+        self.large_data_rows = large_data_rows
+
+    def _key(self, data, *params):
+        return output_key("visualizer", *params, profile_cache.fingerprint(data))
+
+    def _is_large(self, data):
+        return len(data) > self.large_data_rows
 
     def create_visualization(self, data):
         """Create basic visualizations for the data"""
         if data is None or data.empty:
             st.error("No data available for visualization")
             return
-        
+
         st.subheader("Data Visualizations")
-        
+
         # Show basic info
         st.write("**Data Info:**")
         st.write(f"Shape: {data.shape}")
         st.dataframe(data.head())
-        
+
         # Get numeric columns
         numeric_columns = data.select_dtypes(include=['number']).columns.tolist()
-        
+
         if numeric_columns:
-            # Create histogram for first numeric column
-            if len(numeric_columns) > 0:
-                st.write("**Histogram:**")
-                fig, ax = plt.subplots()
-                ax.hist(data[numeric_columns[0]].dropna(), bins=30, alpha=0.7, color='blue')
-                ax.set_title(f'Histogram of {numeric_columns[0]}')
-                ax.set_xlabel(numeric_columns[0])
-                ax.set_ylabel('Frequency')
-                st.pyplot(fig)
-            
+            # Render both charts in parallel, then show them in order
+            charts = [("**Histogram:**", self._submit_histogram(data, numeric_columns[0], figsize=(6.4, 4.8), grid=False))]
+
             # Create correlation heatmap if multiple numeric columns
             if len(numeric_columns) > 1:
-                st.write("**Correlation Heatmap:**")
-                fig, ax = plt.subplots(figsize=(10, 8))
-                sns.heatmap(data[numeric_columns].corr(), annot=True, cmap='coolwarm', ax=ax)
-                st.pyplot(fig)
+                charts.append(("**Correlation Heatmap:**", self._submit_heatmap(data, numeric_columns)))
+
+            for title, future in charts:
+                st.write(title)
+                st.image(future.result())
         else:
             st.info("No numeric columns found for visualization")
 
+    # -- aggregates -------------------------------------------------------------
+
+    def histogram_bins(self, data, column, bins=HISTOGRAM_BINS):
+        """(counts, edges) of a column, computed once per dataset"""
+        key = ("histogram", profile_cache.fingerprint(data), column, bins)
+        return cached_aggregate(key, lambda: np.histogram(_finite_values(data[column]), bins=bins))
+
+    def correlation_matrix(self, data, numeric_columns):
+        key = ("corr", profile_cache.fingerprint(data), tuple(numeric_columns))
+        return cached_aggregate(key, lambda: data[numeric_columns].corr())
+
+    def density_grid(self, data, x_column, y_column, bins=DENSITY_GRID_BINS):
+        """2D point counts on a bins x bins grid: (counts, x_edges, y_edges, points)"""
+        def compute():
+            x = data[x_column].to_numpy(dtype=float, na_value=np.nan)
+            y = data[y_column].to_numpy(dtype=float, na_value=np.nan)
+            mask = np.isfinite(x) & np.isfinite(y)
+            counts, x_edges, y_edges = np.histogram2d(x[mask], y[mask], bins=bins)
+            return counts, x_edges, y_edges, int(mask.sum())
+
+        key = ("density", profile_cache.fingerprint(data), x_column, y_column, bins)
+        return cached_aggregate(key, compute)
+
+    def box_stats(self, data, column):
+        """Matplotlib bxp() statistics with 1.5 IQR whiskers, without drawing the points
+
+        Returns (None, 0) when the column has no finite values.
+        """
+        def compute():
+            values = _finite_values(data[column])
+            if len(values) == 0:
+                return None, 0
+            q1, median, q3 = np.percentile(values, [25, 50, 75])
+            iqr = q3 - q1
+            inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+            outliers = len(values) - len(inside)
+            return {"med": median, "q1": q1, "q3": q3, "whislo": inside.min(), "whishi": inside.max(),
+                    "fliers": [], "label": column}, outliers
+
+        key = ("box", profile_cache.fingerprint(data), column)
+        return cached_aggregate(key, compute)
+
+    # -- charts -----------------------------------------------------------------
+
+    def _submit_histogram(self, data, column, figsize=(10, 6), grid=True):
+        large = self._is_large(data)
+        if large:
+            counts, edges = self.histogram_bins(data, column)
+
+        def draw(fig, ax):
+            if large:
+                ax.stairs(counts, edges, fill=True, alpha=0.7, color='blue')
+            else:
+                ax.hist(data[column].dropna(), bins=HISTOGRAM_BINS, alpha=0.7, color='blue')
+            ax.set_title(f'Histogram of {column}')
+            ax.set_xlabel(column)
+            ax.set_ylabel('Frequency')
+            if grid:
+                ax.grid(axis='y', alpha=0.75)
+        return self.renderer.submit(self._key(data, "histogram", column, figsize, grid), draw, figsize)
+
+    def _submit_heatmap(self, data, numeric_columns):
+        corr = self.correlation_matrix(data, numeric_columns)
+
+        def draw(fig, ax):
+            sns.heatmap(corr, annot=True, cmap='coolwarm', ax=ax)
+        return self.renderer.submit(self._key(data, "heatmap", numeric_columns), draw, (10, 8))
+
     def plot_histogram(self, data, column):
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.hist(data[column].dropna(), bins=30, alpha=0.7, color='blue')
-        ax.set_title(f'Histogram of {column}')
-        ax.set_xlabel(column)
-        ax.set_ylabel('Frequency')
-        ax.grid(axis='y', alpha=0.75)
-        st.pyplot(fig)
+        st.image(self._submit_histogram(data, column).result())
 
     def plot_scatter(self, data, x_column, y_column):
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.scatter(data[x_column], data[y_column], alpha=0.7, color='green')
-        ax.set_title(f'Scatter Plot of {x_column} vs {y_column}')
-        ax.set_xlabel(x_column)
-        ax.set_ylabel(y_column)
-        ax.grid()
-        st.pyplot(fig)
+        large = self._is_large(data)
+        if large:
+            counts, x_edges, y_edges, points = self.density_grid(data, x_column, y_column)
+        else:
+            points = int((data[x_column].notna() & data[y_column].notna()).sum())
+
+        def draw(fig, ax):
+            if points == 0:
+                # An all-zero grid has no range for LogNorm; there is nothing to scatter either
+                _draw_no_values(ax)
+                ax.set_title(f'Scatter Plot of {x_column} vs {y_column}')
+            elif large:
+                # Empty cells stay blank; log colour scale keeps sparse regions visible
+                grid = np.ma.masked_equal(counts.T, 0)
+                mesh = ax.pcolormesh(x_edges, y_edges, grid, cmap='viridis', norm=LogNorm())
+                fig.colorbar(mesh, ax=ax, label='Points per cell')
+                ax.set_title(f'Density of {x_column} vs {y_column} ({points:,} points)')
+            else:
+                ax.scatter(data[x_column], data[y_column], alpha=0.7, color='green')
+                ax.set_title(f'Scatter Plot of {x_column} vs {y_column}')
+            ax.set_xlabel(x_column)
+            ax.set_ylabel(y_column)
+            ax.grid()
+        st.image(self.renderer.render(self._key(data, "scatter", x_column, y_column), draw, (10, 6)))
 
     def plot_box(self, data, column):
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.boxplot(x=data[column], ax=ax)
-        ax.set_title(f'Box Plot of {column}')
-        ax.set_xlabel(column)
-        st.pyplot(fig)
\ No newline at end of file
+        large = self._is_large(data)
+        if large:
+            stats, outliers = self.box_stats(data, column)
+            empty = stats is None
+        else:
+            empty = len(_finite_values(data[column])) == 0
+
+        def draw(fig, ax):
+            if empty:
+                _draw_no_values(ax)
+                ax.set_title(f'Box Plot of {column}')
+            elif large:
+                ax.bxp([stats], vert=False, showfliers=False)
+                ax.set_yticks([])
+                ax.set_title(f'Box Plot of {column} ({outliers:,} outliers not drawn)')
+            else:
+                sns.boxplot(x=data[column], ax=ax)
+                ax.set_title(f'Box Plot of {column}')
+            ax.set_xlabel(column)
+        st.image(self.renderer.render(self._key(data, "box", column), draw, (10, 6)))
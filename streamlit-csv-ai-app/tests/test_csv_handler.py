@@ -0,0 +1,25 @@
+import pandas as pd
+
+from components.csv_handler import optimize_dtypes
+
+
+def _frame():
+    return pd.DataFrame({
+        "job_name": ["dev", "ops", "dev", "dev", "ops", "dev"],
+        "email_sent": [1, 0, 1, 1, 0, 1],
+        "created_at": ["2024-01-0%d" % day for day in range(1, 7)],
+    })
+
+
+def test_repeated_strings_stay_strings_by_default():
+    data = optimize_dtypes(_frame())
+    assert not isinstance(data["job_name"].dtype, pd.CategoricalDtype)
+    # String arithmetic from generated code keeps working
+    assert (data["job_name"] + " x").iloc[0] == "dev x"
+    assert pd.api.types.is_datetime64_any_dtype(data["created_at"])
+    assert data["email_sent"].dtype.itemsize == 4
+
+
+def test_categorical_strings_opt_in():
+    data = optimize_dtypes(_frame(), categorical_strings=True)
+    assert isinstance(data["job_name"].dtype, pd.CategoricalDtype)
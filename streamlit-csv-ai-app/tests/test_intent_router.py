@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from components.data_profile import DatasetProfile
+from components.intent_router import Intent, route_prompt
+
+
+@pytest.fixture
+def dataset():
+    data = pd.DataFrame({
+        "email_sent": [1, 0, 1, None, 1, 0],
+        "job_name": ["dev", "ops", "dev", "dev", None, "ops"],
+    })
+    return data, DatasetProfile.from_dataframe(data, "test")
+
+
+@pytest.mark.parametrize("prompt", [
+    "number of email_sent",
+    "count of job_name",
+    "what is the count of email_sent",
+    "how many job_name",
+    "any job_name",
+    "find",
+])
+def test_ambiguous_counts_go_to_the_llm(dataset, prompt):
+    data, profile = dataset
+    assert route_prompt(prompt, profile, data).kind == Intent.CONVERSATION
+
+
+@pytest.mark.parametrize("prompt", [
+    "number of unique job_name",
+    "how many distinct values in email_sent",
+    "count of different job_name",
+])
+def test_distinct_counts_are_answered_locally(dataset, prompt):
+    data, profile = dataset
+    intent = route_prompt(prompt, profile, data)
+    assert intent.kind == Intent.ANSWER
+    assert "distinct values" in intent.answer
+
+
+@pytest.mark.parametrize("prompt", ["number of missing job_name", "how many null values in email_sent"])
+def test_missing_counts_are_answered_locally(dataset, prompt):
+    data, profile = dataset
+    intent = route_prompt(prompt, profile, data)
+    assert intent.kind == Intent.ANSWER
+    assert "**1** missing values" in intent.answer
+
+
+def test_row_count_is_answered_locally(dataset):
+    data, profile = dataset
+    intent = route_prompt("how many rows", profile, data)
+    assert intent.kind == Intent.ANSWER
+    assert "**6**" in intent.answer
@@ -0,0 +1,42 @@
+import ast
+
+import numpy as np
+import pandas as pd
+
+from components.perf_linter import REPEATED_GROUPBY, lint
+
+
+def _run(source, data):
+    tree, findings = lint(ast.parse(source))
+    namespace = {"data": data.copy(), "pd": pd}
+    exec(compile(tree, "<test>", "exec"), namespace)
+    return namespace, findings
+
+
+def test_groupby_not_hoisted_across_inplace_dropna():
+    source = (
+        "g = data.groupby('k')['a'].sum()\n"
+        "data.dropna(inplace=True)\n"
+        "h = data.groupby('k')['a'].sum()\n"
+    )
+    data = pd.DataFrame({"k": ["x", "y", "x", "y"], "a": [1.0, 2.0, np.nan, 4.0], "b": [1, None, 3, 4]})
+    namespace, findings = _run(source, data)
+    expected = data.dropna().groupby("k")["a"].sum()
+    pd.testing.assert_series_equal(namespace["h"], expected)
+    assert [f.rewritten for f in findings if f.kind == REPEATED_GROUPBY] == [False]
+
+
+def test_mutating_methods_block_groupby_hoist():
+    for statement in ("data.insert(0, 'c', 1)", "data.pop('a')", "data.update(data)",
+                      "data.sort_values('k', inplace=True)", "del data['a']"):
+        source = f"g = data.groupby('k').size()\n{statement}\nh = data.groupby('k').size()\n"
+        _, findings = lint(ast.parse(source))
+        assert [f.rewritten for f in findings if f.kind == REPEATED_GROUPBY] == [False], statement
+
+
+def test_groupby_hoisted_when_frame_unchanged():
+    source = "g = data.groupby('k')['a'].sum()\nh = data.groupby('k')['a'].mean()\n"
+    data = pd.DataFrame({"k": ["x", "y", "x"], "a": [1.0, 2.0, 3.0]})
+    namespace, findings = _run(source, data)
+    assert namespace["h"]["x"] == 2.0
+    assert [f.rewritten for f in findings if f.kind == REPEATED_GROUPBY] == [True]
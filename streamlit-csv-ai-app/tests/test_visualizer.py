@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import visualizer as visualizer_module
+from components.visualizer import Visualizer
+
+
+@pytest.fixture
+def images(monkeypatch):
+    shown = []
+    monkeypatch.setattr(visualizer_module.st, "image", shown.append)
+    return shown
+
+
+def _frames():
+    return {
+        "all_nan": pd.DataFrame({"x": [np.nan] * 5, "y": [np.nan] * 5}),
+        "empty": pd.DataFrame({"x": pd.Series([], dtype=float), "y": pd.Series([], dtype=float)}),
+        "nullable_na": pd.DataFrame({"x": pd.array([None] * 4, dtype="Float64"), "y": [1.0, 2.0, 3.0, 4.0]}),
+    }
+
+
+@pytest.mark.parametrize("name", list(_frames()))
+@pytest.mark.parametrize("large_data_rows", [0, 10 ** 6])
+def test_plots_without_values_render(images, name, large_data_rows):
+    data = _frames()[name]
+    visualizer = Visualizer(large_data_rows=large_data_rows)
+    visualizer.plot_box(data, "x")
+    visualizer.plot_scatter(data, "x", "y")
+    visualizer.plot_histogram(data, "x")
+    assert len(images) == 3
+    assert all(image.startswith(b"\x89PNG") for image in images)
+
+
+def test_box_stats_without_values():
+    data = pd.DataFrame({"x": [np.nan, np.inf, np.nan]})
+    assert Visualizer().box_stats(data, "x") == (None, 0)
+
+
+def test_large_scatter_still_draws_density(images):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"x": rng.normal(size=500), "y": rng.normal(size=500)})
+    visualizer = Visualizer(large_data_rows=0)
+    visualizer.plot_scatter(data, "x", "y")
+    counts, _, _, points = visualizer.density_grid(data, "x", "y")
+    assert points == 500 and counts.sum() == 500
+    assert images[0].startswith(b"\x89PNG")